@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# intentionally left empty
@@ -0,0 +1,165 @@
+import os
+import shutil
+import uuid
+import hashlib
+import threading
+from datetime import datetime, timezone
+from botocore.exceptions import ClientError
+
+##############################
+# --- Local S3 Stand-in ---
+##############################
+#
+# Serves a directory tree laid out as <root>/<bucket>/<key> through the subset of the boto3
+# S3 client API that S3Manager uses: paginated listings (StartAfter/ContinuationToken/MaxKeys),
+# GETs with Range and IfNoneMatch (304), head_object, upload_file and multipart uploads. ETags are the MD5 of the
+# file, as S3 reports for single-part uploads. Every call is counted in self.calls.
+
+
+class _Body:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+
+class _Paginator:
+    def __init__(self, client):
+        self.client = client
+
+    def paginate(self, **kwargs):
+        while True:
+            page = self.client.list_objects_v2(**kwargs)
+            yield page
+            if not page.get('IsTruncated'):
+                return
+            kwargs['ContinuationToken'] = page['NextContinuationToken']
+
+
+class LocalS3Client:
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.calls = {}
+        self.bytes_read = 0
+        self.lock = threading.Lock()
+        self._etags = {}
+        self._uploads = {}
+
+    def _count(self, name, nbytes=0):
+        with self.lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            self.bytes_read += nbytes
+
+    def _path(self, bucket, key):
+        return os.path.join(self.root, bucket, *key.split('/'))
+
+    def _etag(self, path):
+        stat = os.stat(path)
+        cache_key = (path, stat.st_mtime_ns, stat.st_size)
+        etag = self._etags.get(cache_key)
+        if etag is None:
+            with open(path, 'rb') as f:
+                etag = hashlib.md5(f.read()).hexdigest()
+            self._etags[cache_key] = etag
+        return etag
+
+    @staticmethod
+    def _error(code, status, operation):
+        return ClientError({'Error': {'Code': code, 'Message': code},
+                            'ResponseMetadata': {'HTTPStatusCode': status}}, operation)
+
+    def _keys(self, bucket):
+        base = os.path.join(self.root, bucket)
+        keys = []
+        for dirpath, _, filenames in os.walk(base):
+            for filename in filenames:
+                keys.append(os.path.relpath(os.path.join(dirpath, filename), base).replace(os.sep, '/'))
+        return sorted(keys)
+
+    def list_objects_v2(self, Bucket, Prefix='', StartAfter=None, ContinuationToken=None, MaxKeys=1000, **kwargs):
+        self._count('list_objects_v2')
+        after = ContinuationToken or StartAfter
+        keys = [k for k in self._keys(Bucket) if k.startswith(Prefix) and (after is None or k > after)]
+        page = keys[:MaxKeys]
+        contents = []
+        for key in page:
+            path = self._path(Bucket, key)
+            stat = os.stat(path)
+            contents.append({'Key': key, 'Size': stat.st_size, 'ETag': f'"{self._etag(path)}"',
+                             'LastModified': datetime.fromtimestamp(stat.st_mtime, timezone.utc)})
+        response = {'Contents': contents, 'KeyCount': len(page), 'IsTruncated': len(keys) > MaxKeys}
+        if response['IsTruncated']:
+            response['NextContinuationToken'] = page[-1]
+        return response
+
+    def get_paginator(self, operation):
+        if operation != 'list_objects_v2':
+            raise NotImplementedError(operation)
+        return _Paginator(self)
+
+    def head_object(self, Bucket, Key, **kwargs):
+        self._count('head_object')
+        path = self._path(Bucket, Key)
+        if not os.path.isfile(path):
+            raise self._error('404', 404, 'HeadObject')
+        return {'ETag': f'"{self._etag(path)}"', 'ContentLength': os.path.getsize(path)}
+
+    def get_object(self, Bucket, Key, Range=None, IfNoneMatch=None, **kwargs):
+        path = self._path(Bucket, Key)
+        if not os.path.isfile(path):
+            self._count('get_object')
+            raise self._error('NoSuchKey', 404, 'GetObject')
+        etag = f'"{self._etag(path)}"'
+        if IfNoneMatch and IfNoneMatch == etag:
+            self._count('get_object')
+            raise self._error('304', 304, 'GetObject')
+        with open(path, 'rb') as f:
+            if Range:
+                first, _, last = Range.replace('bytes=', '').partition('-')
+                f.seek(int(first))
+                data = f.read(int(last) - int(first) + 1)
+            else:
+                data = f.read()
+        self._count('get_object', len(data))
+        return {'Body': _Body(data), 'ETag': etag, 'ContentLength': len(data)}
+
+    def upload_file(self, Filename, Bucket, Key, **kwargs):
+        self._count('upload_file')
+        path = self._path(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(Filename, path)
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        self._count('create_multipart_upload')
+        upload_id = uuid.uuid4().hex
+        with self.lock:
+            self._uploads[upload_id] = {}
+        return {'UploadId': upload_id, 'Bucket': Bucket, 'Key': Key}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, **kwargs):
+        self._count('upload_part')
+        data = Body if isinstance(Body, bytes) else Body.read()
+        with self.lock:
+            self._uploads[UploadId][PartNumber] = data
+        return {'ETag': f'"{hashlib.md5(data).hexdigest()}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload, **kwargs):
+        self._count('complete_multipart_upload')
+        with self.lock:
+            parts = self._uploads.pop(UploadId)
+        numbers = [part['PartNumber'] for part in MultipartUpload['Parts']]
+        if numbers != sorted(numbers) or any(n not in parts for n in numbers):
+            raise self._error('InvalidPart', 400, 'CompleteMultipartUpload')
+        path = self._path(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            for number in numbers:
+                f.write(parts[number])
+        return {'Bucket': Bucket, 'Key': Key}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId, **kwargs):
+        self._count('abort_multipart_upload')
+        with self.lock:
+            if self._uploads.pop(UploadId, None) is None:
+                raise self._error('NoSuchUpload', 404, 'AbortMultipartUpload')
@@ -0,0 +1,305 @@
+import os
+import sys
+import json
+import math
+import time
+import wave
+import random
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import numpy as np
+import config
+from modules.s3 import S3Manager
+from modules.layouts import LAYOUTS
+from modules.generator import SlideshowGenerator
+from modules.instrumentation import get_instrumentation
+from benchmarks.local_s3 import LocalS3Client
+from benchmarks.synthetic_assets import generate_assets
+
+##############################
+# --- Render Benchmark ---
+##############################
+#
+# Renders every requested mode against synthetic images served by LocalS3Client (no network)
+# and reports frames/s, time per stage, peak RSS and output size as JSON:
+#
+#   python benchmarks/render_benchmark.py --modes abcdefgh --duration 10 --output results.json
+#   python benchmarks/render_benchmark.py --repeat 3 --save-baseline benchmarks/baseline.json
+#   python benchmarks/render_benchmark.py --baseline other.json   # exits 1 on regression
+#
+# Each run happens in a fresh process, so peak RSS and caches are per mode. Only the JSON goes
+# to stdout (when --output is not given); progress and the comparison go to stderr.
+# Results are compared against the committed benchmarks/baseline.json unless --baseline says
+# otherwise (--baseline "" skips the comparison). Only a run with the baseline's settings on the
+# baseline's machine (same CPU count, platform, Python and numpy) can fail; elsewhere the
+# differences are just reported. Re-record it when the reference machine changes.
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Higher is better for fps, lower for the rest.
+COMPARED_METRICS = {'fps': 1, 'peak_rss_mb': -1}
+
+
+def _log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def _folder_prefixes():
+    """Bucket and per-source key prefixes of the configured S3 folders."""
+    bucket, folder1 = S3Manager.parse_s3_path(config.FOLDER1)
+    _, folder2 = S3Manager.parse_s3_path(config.FOLDER2)
+    _, single = S3Manager.parse_s3_path(config.SINGLE_SLIDESHOW_FOLDER)
+    return bucket, {'folder1': folder1.rstrip('/'), 'folder2': folder2.rstrip('/'), 'single': single.rstrip('/')}
+
+
+def _bucket_paths(bucket, prefixes):
+    return {source: f"s3://{bucket}/{prefix}" for source, prefix in prefixes.items()}
+
+
+def write_tone(path, seconds=4, rate=44100, frequency=440):
+    """A short sine-wave WAV, so the audio mux is part of the measurement."""
+    t = np.arange(int(seconds * rate)) / rate
+    samples = (np.sin(2 * math.pi * frequency * t) * 0.2 * 32767).astype('<i2')
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(samples.tobytes())
+
+
+def run_case(args, mode, result_path):
+    """Renders one mode in this process and writes its measurements to result_path."""
+    random.seed(args.seed)
+    bucket, prefixes = _folder_prefixes()
+    folders = _bucket_paths(bucket, prefixes)
+    client = LocalS3Client(args.assets)
+    text_configs = [dict(c, font_path=os.path.join(REPO_ROOT, c['font_path'])) for c in config.TEXT_CONFIGS]
+    output_file = os.path.join(args.work_dir, f"bench_{mode}.mp4")
+
+    profile_path = os.path.join(args.profile_dir, f"render_{mode}.prof") if args.profile_dir else None
+    generator = SlideshowGenerator(
+        args.width, args.height, args.fps, config.QUALITY, text_configs, args.audio,
+        folders['folder1'], folders['folder2'], folders['single'], output_file,
+        config.RANDOM_CHOICE, args.opposite, args.duration, args.duration, config.TRANSITION_DURATION,
+        bucket, f"videos/bench_{mode}.mp4", encoder=args.encoder,
+        s3_manager=S3Manager(s3_client=client, upload_part_size=config.UPLOAD_PART_SIZE,
+                             upload_concurrency=config.UPLOAD_CONCURRENCY),
+        execution=args.execution, workers=args.workers, block_size=args.block_size, profile_path=profile_path,
+        stream_upload=args.upload == 'stream'
+    )
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    ok = generator.render_layout(LAYOUTS[mode])
+    seconds = time.perf_counter() - start
+    seconds_to_url = None
+    if ok and args.upload != 'none':
+        generator.uploaded_url or generator.upload_video()
+        seconds_to_url = round(time.perf_counter() - start, 3)
+    frames = generator._total_frames()
+
+    stages = get_instrumentation().summary()['stages']
+    result = {
+        'ok': bool(ok),
+        'frames': frames,
+        'seconds': round(seconds, 3),
+        'cpu_seconds': round(time.process_time() - cpu_start, 3),
+        'fps': round(frames / seconds, 2) if seconds > 0 else None,
+        # Render start to the video being in the bucket (with --upload)
+        'seconds_to_url': seconds_to_url,
+        # Per-stage wall/CPU seconds, bytes and memory (see modules/instrumentation.py)
+        'stages': stages,
+        # ru_maxrss is in KiB on Linux; children covers the ffmpeg encoder and worker processes.
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'children_peak_rss_mb': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        'output_bytes': os.path.getsize(output_file) if os.path.exists(output_file) else None,
+        's3_gets': client.calls.get('get_object', 0),
+        's3_bytes': client.bytes_read,
+    }
+    with open(result_path, 'w') as f:
+        json.dump(result, f)
+
+
+def run_mode(args, mode):
+    """Runs one mode args.repeat times in fresh processes and keeps the fastest run."""
+    runs = []
+    for _ in range(args.repeat):
+        fd, result_path = tempfile.mkstemp(suffix='.json', dir=args.work_dir)
+        os.close(fd)
+        cmd = [sys.executable, os.path.abspath(__file__)] + sys.argv[1:] + [
+            '--case', mode, '--case-output', result_path, '--assets', args.assets,
+            '--work-dir', args.work_dir, '--audio', args.audio or '']
+        completed = subprocess.run(cmd, stdout=None if args.verbose else subprocess.DEVNULL)
+        try:
+            if completed.returncode != 0:
+                raise RuntimeError(f"exit status {completed.returncode}")
+            with open(result_path) as f:
+                runs.append(json.load(f))
+        except (RuntimeError, ValueError) as e:
+            _log(f"Mode {mode} failed: {e}")
+            return {'ok': False, 'error': str(e)}
+        finally:
+            os.remove(result_path)
+    best = min(runs, key=lambda r: r['seconds'])
+    best['runs'] = len(runs)
+    return best
+
+
+def compare(report, baseline, tolerance):
+    """
+    Compares report against baseline mode by mode. Returns (lines, regressions) where a
+    regression is a metric of COMPARED_METRICS worse than the baseline by more than tolerance.
+    Regressions are only counted when both runs used the same settings on the same machine.
+    """
+    lines = []
+    regressions = []
+    # Numbers from other settings or another machine are shown but never fail the run.
+    comparable = True
+    if report['settings'] != baseline.get('settings'):
+        lines.append("The baseline was recorded with different settings; reporting only.")
+        comparable = False
+    if report['environment'] != baseline.get('environment'):
+        lines.append(f"The baseline was recorded on a different machine ({baseline.get('environment')}); "
+                     "reporting only.")
+        comparable = False
+    for mode, result in report['results'].items():
+        base = baseline.get('results', {}).get(mode)
+        if not base or not result.get('ok') or not base.get('ok'):
+            lines.append(f"{mode}: no comparable baseline")
+            continue
+        parts = []
+        for metric, direction in COMPARED_METRICS.items():
+            current, previous = result.get(metric), base.get(metric)
+            if not current or not previous:
+                continue
+            change = (current - previous) / previous
+            parts.append(f"{metric} {previous} -> {current} ({change:+.1%})")
+            if comparable and change * direction < -tolerance:
+                regressions.append(f"{mode} {metric}")
+        lines.append(f"{mode}: " + ", ".join(parts))
+    return lines, regressions
+
+
+def main(args):
+    bucket, prefixes = _folder_prefixes()
+    written = generate_assets(args.assets, bucket, prefixes, args.pairs, args.pages, args.image_size, args.seed)
+    if written:
+        _log(f"Generated {written} synthetic images in {args.assets}")
+    if args.audio is None:
+        args.audio = os.path.join(args.work_dir, 'tone.wav')
+        write_tone(args.audio)
+
+    report = {
+        'benchmark': 'render',
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'settings': {
+            'width': args.width, 'height': args.height, 'fps': args.fps, 'duration': args.duration,
+            'encoder': args.encoder, 'execution': args.execution, 'workers': args.workers,
+            'block_size': args.block_size, 'opposite': args.opposite, 'seed': args.seed,
+            'image_size': args.image_size, 'upload': args.upload,
+        },
+        'results': {},
+    }
+    for mode in args.modes:
+        result = run_mode(args, mode)
+        report['results'][mode] = result
+        if result.get('ok'):
+            stages = ", ".join(f"{name} {s['wall_seconds']:.2f}s" for name, s in result['stages'].items())
+            _log(f"Mode {mode}: {result['frames']} frames in {result['seconds']}s ({result['fps']} fps), "
+                 f"peak RSS {result['peak_rss_mb']} MB, {result['output_bytes']} bytes; {stages}")
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            f.write(text + "\n")
+        _log(f"Baseline saved to {args.save_baseline}")
+
+    failed = [mode for mode, result in report['results'].items() if not result.get('ok')]
+    if failed:
+        _log(f"Failed modes: {', '.join(failed)}")
+    regressions = []
+    if args.baseline and not os.path.exists(args.baseline):
+        _log(f"No baseline at {args.baseline}; nothing to compare against.")
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        _log(f"Compared with {args.baseline} ({baseline.get('created')}):")
+        lines, regressions = compare(report, baseline, args.tolerance)
+        for line in lines:
+            _log(line)
+        if regressions:
+            _log(f"Regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+    return 1 if failed or regressions else 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark SlideshowGenerator renders on synthetic images.")
+    parser.add_argument("--modes", default="abcdefgh", help="Layouts to render (default: all).")
+    parser.add_argument("--width", type=int, default=config.WIDTH)
+    parser.add_argument("--height", type=int, default=config.HEIGHT)
+    parser.add_argument("--fps", type=int, default=config.SPEED)
+    parser.add_argument("--duration", type=float, default=10, help="Video length in seconds.")
+    parser.add_argument("--encoder", choices=("ffmpeg", "cv2"), default=config.ENCODER)
+    parser.add_argument("--execution", default=config.EXECUTION)
+    parser.add_argument("--workers", type=int, default=config.RENDER_WORKERS)
+    parser.add_argument("--block-size", type=int, default=config.RENDER_BLOCK_FRAMES)
+    parser.add_argument("--opposite", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per mode; the fastest is reported.")
+    parser.add_argument("--pairs", type=int, default=90, help="Synthetic cartoon/outline pairs.")
+    parser.add_argument("--pages", type=int, default=30, help="Synthetic slideshow pages.")
+    parser.add_argument("--image-size", type=int, default=1024, help="Approximate synthetic image side.")
+    parser.add_argument("--assets", default=os.path.join(tempfile.gettempdir(), "auto_post_bench_assets"),
+                        help="Directory of the synthetic images (generated once, then reused).")
+    parser.add_argument("--audio", default=None, help="Audio file to mux (default: a generated tone).")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="Compare against this JSON report and exit 1 on regression "
+                             "(default: benchmarks/baseline.json; \"\" to skip).")
+    parser.add_argument("--save-baseline", help="Also write the JSON report here.")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression.")
+    parser.add_argument("--upload", choices=("none", "after", "stream"), default="none",
+                        help="Also upload the video to the local bucket, after the encode or streamed during it.")
+    parser.add_argument("--profile-dir", help="Save a cProfile capture of each mode's render loop here.")
+    parser.add_argument("--verbose", action="store_true", help="Show the generator's own output.")
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    parser.add_argument("--case-output", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.case:
+        args.audio = args.audio or None
+        run_case(args, args.case, args.case_output)
+        sys.exit(0)
+    for mode in args.modes:
+        if mode not in LAYOUTS:
+            sys.exit(f"Unknown mode '{mode}' (expected some of {''.join(sorted(LAYOUTS))}).")
+    work_dir = tempfile.mkdtemp(prefix="render_bench_")
+    args.work_dir = work_dir
+    try:
+        status = main(args)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    sys.exit(status)
@@ -0,0 +1,84 @@
+import os
+import numpy as np
+import cv2
+
+##############################
+# --- Synthetic Benchmark Assets ---
+##############################
+#
+# Deterministic stand-ins for the three S3 folders: flat-coloured cartoon drawings, the
+# matching black-on-white outlines (same file names, as in FOLDER1/FOLDER2) and portrait
+# colouring-book pages. They are real JPEGs of realistic size, so decode and resize cost
+# about what production images do.
+
+
+def _shapes(rng, size):
+    """Random circles, ellipses and rectangles as (kind, params, BGR colour)."""
+    shapes = []
+    w, h = size
+    for _ in range(int(rng.integers(6, 14))):
+        colour = tuple(int(c) for c in rng.integers(40, 256, 3))
+        kind = rng.choice(['circle', 'ellipse', 'rectangle'])
+        cx, cy = int(rng.integers(0, w)), int(rng.integers(0, h))
+        a, b = int(rng.integers(w // 16, w // 4)), int(rng.integers(h // 16, h // 4))
+        shapes.append((kind, (cx, cy, a, b, int(rng.integers(0, 180))), colour))
+    return shapes
+
+
+def _draw(image, shapes, filled):
+    for kind, (cx, cy, a, b, angle), colour in shapes:
+        for thickness, fill in ((-1, colour), (max(3, image.shape[1] // 200), (0, 0, 0))):
+            if thickness == -1 and not filled:
+                continue
+            if kind == 'circle':
+                cv2.circle(image, (cx, cy), a, fill, thickness, cv2.LINE_AA)
+            elif kind == 'ellipse':
+                cv2.ellipse(image, (cx, cy), (a, b), angle, 0, 360, fill, thickness, cv2.LINE_AA)
+            else:
+                cv2.rectangle(image, (cx - a, cy - b), (cx + a, cy + b), fill, thickness, cv2.LINE_AA)
+
+
+def _write(path, image, quality=90):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    cv2.imwrite(path, image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+
+
+def generate_assets(root, bucket, folders, pairs=90, pages=30, image_size=1024, seed=0):
+    """
+    Writes the synthetic images under root/bucket (the layout LocalS3Client serves):
+      folders['folder1']/<n>_pic.jpg   cartoons
+      folders['folder2']/<n>_pic.jpg   their outlines
+      folders['single']/<n>_book_page.jpeg   colouring pages
+    folders maps each source to its key prefix. Existing files are kept, so the assets are
+    generated once per root. Returns the number of files written.
+    """
+    rng = np.random.default_rng(seed)
+    written = 0
+    for n in range(1, pairs + 1):
+        # Slightly varied sizes/aspect ratios, like the real uploads.
+        size = (int(image_size * rng.uniform(0.85, 1.15)), int(image_size * rng.uniform(0.85, 1.15)))
+        shapes = _shapes(rng, size)
+        background = tuple(int(c) for c in rng.integers(180, 256, 3))
+        cartoon = os.path.join(root, bucket, folders['folder1'], f"{n}_pic.jpg")
+        outline = os.path.join(root, bucket, folders['folder2'], f"{n}_pic.jpg")
+        if not os.path.exists(cartoon):
+            image = np.empty((size[1], size[0], 3), dtype=np.uint8)
+            image[:] = background
+            _draw(image, shapes, filled=True)
+            _write(cartoon, image)
+            written += 1
+        if not os.path.exists(outline):
+            image = np.full((size[1], size[0], 3), 255, dtype=np.uint8)
+            _draw(image, shapes, filled=False)
+            _write(outline, image)
+            written += 1
+    for n in range(1, pages + 1):
+        size = (image_size, int(image_size * 1.414))
+        shapes = _shapes(rng, size)
+        page = os.path.join(root, bucket, folders['single'], f"{n}_book_page.jpeg")
+        if not os.path.exists(page):
+            image = np.full((size[1], size[0], 3), 255, dtype=np.uint8)
+            _draw(image, shapes, filled=False)
+            _write(page, image)
+            written += 1
+    return written
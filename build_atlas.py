@@ -0,0 +1,22 @@
+import argparse
+from config import *
+from modules.s3 import S3Manager
+from modules.atlas import build_atlases
+from modules.layouts import source_geometries
+
+
+def main(atlas_dir):
+    # Every tile geometry any layout uses at the configured frame size, per source folder
+    s3_manager = S3Manager(cache_dir=S3_CACHE_DIR or None, disk_cache_bytes=S3_CACHE_MAX_BYTES,
+                           manifest_dir=LISTING_MANIFEST_DIR or None, listing_ttl=LISTING_TTL)
+    folders = {'folder1': FOLDER1, 'folder2': FOLDER2, 'single': SINGLE_SLIDESHOW_FOLDER}
+    for source, geometries in source_geometries(WIDTH, HEIGHT).items():
+        build_atlases(s3_manager, folders[source], sorted(geometries), atlas_dir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the pre-resized tile atlases used by main_story.py.")
+    parser.add_argument("--atlas-dir", default=ATLAS_DIR or "auto_post_reels/atlas",
+                        help="Output directory (set ATLAS_DIR to the same path for renders).")
+    args = parser.parse_args()
+    main(args.atlas_dir)
@@ -1,3 +1,4 @@
+import os
 import random
 
 ###############################
@@ -10,6 +11,26 @@ FOLDER2 = "s3://lily-images/reels/outline_images"
 S3_VIDEO_BUCKET = "lily-images"
 S3_VIDEO_KEY = "videos/production_video.mp4"
 SINGLE_SLIDESHOW_FOLDER = "s3://lily-images/pages"
+# Optional persistent S3 object cache (validated by ETag); empty disables it
+S3_CACHE_DIR = os.getenv("S3_CACHE_DIR", "")
+S3_CACHE_MAX_BYTES = 2 * 1024 ** 3
+# Optional persisted S3 listing manifests, reused for LISTING_TTL seconds; empty keeps them in memory
+LISTING_MANIFEST_DIR = os.getenv("LISTING_MANIFEST_DIR", "")
+LISTING_TTL = 6 * 3600
+# Optional persisted FOLDER1/FOLDER2 pairing index (pairs, numeric ids); empty keeps it in memory
+PAIRING_INDEX = os.getenv("PAIRING_INDEX", "")
+# Optional pre-resized tile atlases built by build_atlas.py; empty disables them
+ATLAS_DIR = os.getenv("ATLAS_DIR", "")
+# Video upload: parts of UPLOAD_PART_SIZE bytes (>= 5 MiB) sent UPLOAD_CONCURRENCY at a time.
+# STREAM_UPLOAD uploads while ffmpeg is still encoding ("ffmpeg" encoder, not "processes"). The
+# video is then a fragmented MP4, written front to back instead of rewritten with +faststart.
+UPLOAD_PART_SIZE = 8 * 1024 * 1024
+UPLOAD_CONCURRENCY = 8
+STREAM_UPLOAD = False
+# Optional JSON run summary (per-stage wall/CPU time, bytes, peak memory); it is always printed
+RUN_SUMMARY_FILE = os.getenv("RUN_SUMMARY_FILE", "")
+# Optional cProfile capture of the render loop (a .prof path); empty disables profiling
+PROFILE_RENDER = os.getenv("PROFILE_RENDER", "")
 # Local paths
 OUTPUT_FILE = "auto_post_reels/temp/temp_video.mp4"
 AUDIO_PATH = "auto_post_reels/reel_sounds"
@@ -24,9 +45,23 @@ VIDEO_MAX_LENGTH = 20
 DURATION = 40
 TRANSITION_DURATION = 2
 RANDOM_CHOICE = True
+ENCODER = "ffmpeg"   # "ffmpeg": single-pass H.264 + AAC; "cv2": mp4v writer + moviepy audio pass
+EXECUTION = "serial"  # "serial"; "threads" to overlap compositing/overlay/encoding; "processes" for parallel segments
+RENDER_WORKERS = None  # compositing threads ("threads", default 2) or worker processes ("processes", default one per CPU)
+RENDER_BLOCK_FRAMES = 32  # frames whose scroll offsets/strip sections are prepared together ("serial"/"processes")
 MODE =  random.choice(['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h'])
 OPPOSITE = random.choice([True, False])      # set in main randomly
 
+# Per-flow publishing deadlines in seconds (see modules/publisher.py)
+PUBLISH_DEADLINES = {
+    "Facebook Story": 180,
+    "Instagram Story": 240,
+    "Facebook Reel": 180,
+    "Instagram Reel": 240,
+    "Instagram Photo": 120,
+    "Facebook Photo": 120,
+}
+
 # Text overlay configurations
 TEXT_CONFIGS = [
     {
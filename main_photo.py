@@ -1,8 +1,10 @@
-import time
 import argparse
+from config import PUBLISH_DEADLINES, RUN_SUMMARY_FILE
 import modules.instagram_photo as ig
 import modules.facebook_photo as fb
 from modules import gen_post_page  
+from modules.publisher import publish_all
+from modules.instrumentation import get_instrumentation
 
 def main(dry_run=False):
     # 1. Generate the Instagram post content (caption) and image URL
@@ -15,20 +17,25 @@ def main(dry_run=False):
 
     if dry_run:
         print("\n[DRY RUN] Skipping actual posting to Instagram and Facebook.")
-        return
+    else:
+        # 2 & 3. Post to Instagram and Facebook concurrently
+        publish_all({
+            "Instagram Photo": lambda: ig.post_to_instagram(image_url, post),
+            "Facebook Photo": lambda: fb.post_to_facebook(post, image_url),
+        }, deadlines=PUBLISH_DEADLINES)
 
-    # 2. Post to Instagram
-    ig.post_to_instagram(image_url, post)
-    
-    # 3. Wait 5 seconds before posting to Facebook
-    time.sleep(5)
-    
-    # 4. Post to Facebook
-    fb.post_to_facebook(post, image_url)
+    # 4. Prepare captions for the next posts, off the critical path of this one
+    try:
+        gen_post_page.refill_caption_queue()
+    except Exception as e:
+        print("Caption queue refill failed:", str(e))
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run the social media posting workflow.")
     parser.add_argument("--dry-run", action="store_true", help="Run the workflow without posting to IG and FB")
     args = parser.parse_args()
 
-    main(dry_run=args.dry_run)
\ No newline at end of file
+    try:
+        main(dry_run=args.dry_run)
+    finally:
+        get_instrumentation().emit(RUN_SUMMARY_FILE or None)
\ No newline at end of file
@@ -2,8 +2,11 @@ import os
 import argparse
 from config import *
 from modules.generator import SlideshowGenerator  
+from modules.s3 import S3Manager
 from modules.facebook_story import FacebookStory
 from modules.insta_story import InstaStory
+from modules.publisher import publish_all
+from modules.instrumentation import get_instrumentation
 # from dotenv import load_dotenv
 # load_dotenv()
 
@@ -14,7 +17,13 @@ def main(dry_run=False):
         WIDTH, HEIGHT, SPEED, QUALITY, TEXT_CONFIGS, AUDIO_PATH,
         FOLDER1, FOLDER2, SINGLE_SLIDESHOW_FOLDER, OUTPUT_FILE, RANDOM_CHOICE, OPPOSITE,
         DURATION, VIDEO_MAX_LENGTH, TRANSITION_DURATION,
-        S3_VIDEO_BUCKET, S3_VIDEO_KEY
+        S3_VIDEO_BUCKET, S3_VIDEO_KEY, encoder=ENCODER,
+        s3_manager=S3Manager(cache_dir=S3_CACHE_DIR or None, disk_cache_bytes=S3_CACHE_MAX_BYTES,
+                             atlas_dir=ATLAS_DIR or None,
+                             manifest_dir=LISTING_MANIFEST_DIR or None, listing_ttl=LISTING_TTL,
+                             upload_part_size=UPLOAD_PART_SIZE, upload_concurrency=UPLOAD_CONCURRENCY),
+        pairing_index_path=PAIRING_INDEX or None, execution=EXECUTION, workers=RENDER_WORKERS,
+        block_size=RENDER_BLOCK_FRAMES, profile_path=PROFILE_RENDER or None, stream_upload=STREAM_UPLOAD
     )
 
     video_url = generator.generate_slideshow(MODE)
@@ -33,40 +42,20 @@ def main(dry_run=False):
     ig = InstaStory()
     fb = FacebookStory()
 
-    # --- Facebook Story ---
-    fb_story_video_id, fb_story_upload_url = fb.init_story_upload()
-    if fb.upload_story_video(fb_story_upload_url, video_url):
-        success, post_id = fb.publish_story(fb_story_video_id)
-        print("Facebook Story published:", success, post_id)
-    else:
-        print("Facebook Story upload failed")
-
-    # --- Instagram Story ---
-    insta_story_media_id = ig.publish_story(video_url)
-    if insta_story_media_id:
-        print("Instagram Story published, Media ID:", insta_story_media_id)
-    else:
-        print("Instagram Story failed")
-
-    # --- Facebook Reel ---
-    fb_reel_video_id, fb_reel_upload_url = fb.init_reel_upload()
-    if fb.upload_reel_video(fb_reel_upload_url, video_url):
-        success, post_id = fb.publish_reel(fb_reel_video_id, caption)
-        print("Facebook Reel published:", success, post_id)
-    else:
-        print("Facebook Reel upload failed")
-
-    # --- Instagram Reel ---
-    insta_reel_media_id = ig.publish_reel(video_url, caption)
-    if insta_reel_media_id:
-        print("Instagram Reel published, Media ID:", insta_reel_media_id)
-    else:
-        print("Instagram Reel failed")
-
+    # Publish all four formats concurrently, each under its own deadline
+    publish_all({
+        "Facebook Story": lambda: fb.share_story(video_url),
+        "Instagram Story": lambda: ig.publish_story(video_url),
+        "Facebook Reel": lambda: fb.share_reel(video_url, caption),
+        "Instagram Reel": lambda: ig.publish_reel(video_url, caption),
+    }, deadlines=PUBLISH_DEADLINES)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run the story and reel posting workflow.")
     parser.add_argument("--dry-run", action="store_true", help="Run the workflow without posting to IG and FB")
     args = parser.parse_args()
 
-    main(dry_run=args.dry_run)
+    try:
+        main(dry_run=args.dry_run)
+    finally:
+        get_instrumentation().emit(RUN_SUMMARY_FILE or None)
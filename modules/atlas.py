@@ -0,0 +1,127 @@
+import os
+import re
+import json
+import uuid
+import numpy as np
+
+##############################
+# --- Pre-resized Asset Atlas ---
+##############################
+#
+# An atlas holds every image of one S3 folder already resized to one tile geometry
+# (see utils.resize_to_geometry). It is two files in the atlas directory:
+#
+#   <name>.json          index: bucket, prefix, geometry, data file name, and for each key
+#                        [offset, height, width, etag]
+#   <name>.<build>.u8    the tiles' BGR pixels back to back, read through a read-only memmap
+#
+# Renders read tiles straight from the mapping (no download, decode or resize), and concurrent
+# renders share the same pages through the OS page cache.
+
+
+def atlas_name(bucket, prefix, geometry):
+    kind, size = geometry
+    return re.sub(r'[^A-Za-z0-9]+', '_', f"{bucket}/{prefix}").strip('_') + f"-{kind}{size}"
+
+
+class Atlas:
+    """Read-only view of one built atlas."""
+
+    def __init__(self, index_path):
+        with open(index_path) as f:
+            index = json.load(f)
+        self.bucket = index['bucket']
+        self.prefix = index['prefix']
+        self.geometry = tuple(index['geometry'])
+        self.tiles = index['tiles']
+        data_path = os.path.join(os.path.dirname(index_path), index['data'])
+        self.data = np.memmap(data_path, dtype=np.uint8, mode='r') if self.tiles else None
+
+    def get(self, key, etag=None):
+        """
+        Returns the tile of key as a read-only (h, w, 3) view, or None when the key is missing
+        or the atlas was built from a different version of the object (etag given and different).
+        """
+        entry = self.tiles.get(key)
+        if entry is None:
+            return None
+        offset, h, w, tile_etag = entry
+        if etag and tile_etag and etag != tile_etag:
+            return None
+        return self.data[offset:offset + h * w * 3].reshape(h, w, 3)
+
+
+def load_atlas(atlas_dir, bucket, prefix, geometry):
+    """Opens the atlas of (bucket, prefix, geometry) in atlas_dir, or returns None if it was never built."""
+    index_path = os.path.join(atlas_dir, atlas_name(bucket, prefix, geometry) + '.json')
+    if not os.path.exists(index_path):
+        return None
+    try:
+        return Atlas(index_path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Ignoring unreadable atlas {index_path}: {e}")
+        return None
+
+
+def _write_atlas(atlas_dir, name, bucket, prefix, geometry, keys, tiles, etags):
+    """Writes the data file and index of one atlas, then drops superseded data files."""
+    data_name = f"{name}.{uuid.uuid4().hex[:8]}.u8"
+    entries = {}
+    offset = 0
+    with open(os.path.join(atlas_dir, data_name), 'wb') as f:
+        for key in keys:
+            tile = tiles.get(key)
+            if tile is None:
+                continue
+            h, w = tile.shape[:2]
+            f.write(np.ascontiguousarray(tile).tobytes())
+            entries[key] = [offset, h, w, etags.get((bucket, key))]
+            offset += h * w * 3
+
+    index_path = os.path.join(atlas_dir, name + '.json')
+    with open(index_path + '.tmp', 'w') as f:
+        json.dump({'bucket': bucket, 'prefix': prefix, 'geometry': list(geometry),
+                   'data': data_name, 'tiles': entries}, f)
+    os.replace(index_path + '.tmp', index_path)
+
+    # Renders that already mapped an older data file keep reading it after the unlink.
+    for file_name in os.listdir(atlas_dir):
+        if file_name.startswith(name + '.') and file_name.endswith('.u8') and file_name != data_name:
+            os.remove(os.path.join(atlas_dir, file_name))
+    return len(entries), offset
+
+
+def build_atlases(s3_manager, s3_path, geometries, atlas_dir):
+    """
+    Builds (or refreshes) one atlas per geometry for every image under s3_path.
+    Tiles whose ETag is unchanged since the previous build are copied from it; the rest are
+    downloaded and decoded once per key, whatever the number of geometries.
+    """
+    bucket, prefix = s3_manager.parse_s3_path(s3_path)
+    os.makedirs(atlas_dir, exist_ok=True)
+    keys = s3_manager.list_images(s3_path)
+
+    tiles = {}
+    requests = []
+    for geometry in geometries:
+        previous = load_atlas(atlas_dir, bucket, prefix, geometry)
+        tiles[geometry] = {}
+        for key in keys:
+            tile = previous.get(key, s3_manager.etags.get((bucket, key))) if previous else None
+            if tile is not None:
+                tiles[geometry][key] = tile
+            else:
+                requests.append((key, geometry))
+
+    fetched, errors = s3_manager.read_images(bucket, requests)
+    for key, error in errors.items():
+        print(f"Skipping s3://{bucket}/{key}: {error}")
+    for (key, geometry), tile in zip(requests, fetched):
+        if tile is not None:
+            tiles[geometry][key] = tile
+
+    for geometry in geometries:
+        name = atlas_name(bucket, prefix, geometry)
+        count, size = _write_atlas(atlas_dir, name, bucket, prefix, geometry, keys, tiles[geometry],
+                                   s3_manager.etags)
+        print(f"Atlas {name}: {count} tiles, {size / 1e6:.1f} MB")
@@ -0,0 +1,151 @@
+import os
+import shutil
+import tempfile
+import threading
+import subprocess
+import numpy as np
+
+##############################
+# --- ffmpeg Pipe Encoder ---
+##############################
+
+def find_ffmpeg():
+    """Returns the ffmpeg executable: the one on PATH, else the binary bundled with imageio-ffmpeg."""
+    path = shutil.which('ffmpeg')
+    if path:
+        return path
+    try:
+        import imageio_ffmpeg
+    except ImportError:
+        raise RuntimeError("ffmpeg not found. Install it or `pip install imageio-ffmpeg`.")
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+def quality_to_crf(quality):
+    """
+    Maps the QUALITY setting (0-100, as given to cv2.VideoWriter) to a libx264 CRF: 100 is
+    lossless, the default 75 gives x264's own default of 23 and anything below ~45 the
+    maximum of 51.
+    """
+    if not 0 <= quality <= 100:
+        raise ValueError(f"Invalid quality {quality} (expected 0-100).")
+    return min(51, round((100 - quality) * 23 / 25))
+
+
+class FFmpegWriter:
+    """
+    Streams raw BGR frames into one ffmpeg process that writes the final H.264 file,
+    muxing AAC audio from audio_file (looped or cut to the video length) in the same pass.
+    Exposes the write()/release() interface of cv2.VideoWriter.
+
+    With stream set (any object with write(bytes)), the file is muxed as fragmented MP4,
+    which ffmpeg emits front to back without seeking. Its bytes are then passed to
+    stream as they are produced and also written to output_file. Failures of stream are
+    kept in stream_error and do not stop the local file.
+
+    If ffmpeg exits early, the first write() it can no longer take raises with ffmpeg's
+    error output.
+    """
+
+    def __init__(self, output_file, width, height, fps, audio_file=None, crf=23, preset='medium', threads=None,
+                 stream=None):
+        self.output_file = output_file
+        self.frame_shape = (height, width, 3)
+        self.stream = stream
+        self.stream_error = None
+        self.reader = None
+        # ffmpeg's error output, kept for the exception raised if it fails.
+        self.errors = tempfile.TemporaryFile()
+        cmd = [
+            find_ffmpeg(), '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-r', str(fps),
+            '-i', 'pipe:0',
+        ]
+        if audio_file:
+            cmd += ['-stream_loop', '-1', '-i', audio_file, '-map', '0:v:0', '-map', '1:a:0',
+                    '-c:a', 'aac', '-shortest']
+        cmd += ['-c:v', 'libx264', '-preset', preset, '-crf', str(crf), '-pix_fmt', 'yuv420p']
+        if threads:
+            cmd += ['-threads', str(threads)]
+        if stream is None:
+            cmd += ['-movflags', '+faststart', output_file]
+            self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=self.errors)
+            return
+        # +faststart rewrites the finished file; fragments need no second pass.
+        cmd += ['-movflags', '+frag_keyframe+empty_moov+default_base_moof', '-f', 'mp4', 'pipe:1']
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=self.errors)
+        self.reader = threading.Thread(target=self._tee, name='ffmpeg-output', daemon=True)
+        self.reader.start()
+
+    def _tee(self, chunk_size=256 * 1024):
+        """Copies ffmpeg's output to output_file and, until it fails, to stream."""
+        with open(self.output_file, 'wb') as f:
+            while True:
+                chunk = self.process.stdout.read1(chunk_size)
+                if not chunk:
+                    break
+                f.write(chunk)
+                if self.stream_error is None:
+                    try:
+                        self.stream.write(chunk)
+                    except Exception as e:
+                        self.stream_error = e
+
+    def write(self, frame):
+        if frame.shape != self.frame_shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match {self.frame_shape}.")
+        if self.process.stdin.closed:
+            raise RuntimeError(f"Cannot write to {self.output_file}: the encoder has been released.")
+        try:
+            self.process.stdin.write(np.ascontiguousarray(frame).data)
+        except BrokenPipeError:
+            self._close_input()
+            raise self._failure(self._wait()) from None
+
+    def _close_input(self):
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+
+    def _wait(self):
+        if self.reader is not None:
+            self.reader.join()
+        return self.process.wait()
+
+    def _failure(self, returncode):
+        self.errors.seek(0)
+        message = self.errors.read().decode(errors='replace').strip()
+        return RuntimeError(f"ffmpeg exited with status {returncode} while writing {self.output_file}"
+                            + (f": {message}" if message else ""))
+
+    def release(self):
+        if not self.process.stdin.closed:
+            self._close_input()
+        returncode = self._wait()
+        if returncode != 0:
+            raise self._failure(returncode)
+
+
+def concat_segments(segment_files, output_file, audio_file=None):
+    """
+    Joins H.264 segments (all encoded with the same settings, e.g. by FFmpegWriter) into
+    output_file with the concat demuxer, copying the video stream without re-encoding.
+    Audio from audio_file is looped or cut to the video length and muxed in the same pass.
+    """
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+        for path in segment_files:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+        list_file = f.name
+    cmd = [find_ffmpeg(), '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0', '-i', list_file]
+    if audio_file:
+        cmd += ['-stream_loop', '-1', '-i', audio_file, '-map', '0:v:0', '-map', '1:a:0',
+                '-c:a', 'aac', '-shortest']
+    cmd += ['-c:v', 'copy', '-movflags', '+faststart', output_file]
+    try:
+        result = subprocess.run(cmd)
+    finally:
+        os.remove(list_file)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg exited with status {result.returncode} while joining segments into {output_file}")
@@ -1,6 +1,5 @@
-import requests
-import time
 import os
+from .graph import get_client, GraphAPIError
 
 # Commented out as it will not be used for now
 # def post_image_to_feed(page_id, page_access_token, post, image_url):
@@ -22,6 +21,8 @@ import os
 #         print("Error parsing JSON response:", e)
 #         return None
 
+COMMENT_MESSAGE = "Visit Our Website To View All The Books👉 https://lily10coloringbooks.fun"
+
 def post_comment(page_post_id, page_access_token):
     """
     Posts a comment under a previously created Facebook post.
@@ -29,11 +30,14 @@ def post_comment(page_post_id, page_access_token):
     """
     post_url = f"https://graph.facebook.com/v22.0/{page_post_id}/comments"
     data = {
-        "message": "Visit Our Website To View All The Books👉 https://lily10coloringbooks.fun",
+        "message": COMMENT_MESSAGE,
         "access_token": page_access_token
     }
-    r = requests.post(post_url, json=data)
-    print("Comment Post Response:", r.text)
+    try:
+        response_json = get_client().post(post_url, json=data)
+        print("Comment Post Response:", response_json)
+    except GraphAPIError as e:
+        print("Comment Post Error:", e)
 
 def post_image(page_id, page_access_token, post, image_url):
     """
@@ -46,33 +50,57 @@ def post_image(page_id, page_access_token, post, image_url):
         "url": image_url,
         "access_token": page_access_token
     }
-    r = requests.post(post_url, json=data)
-    print("Image Post Response:", r.text)
     try:
-        response_json = r.json()
-        # Extract and return the post_id (not the image id)
-        return response_json.get("post_id")
-    except Exception as e:
-        print("Error parsing JSON response:", e)
+        response_json = get_client().post(post_url, json=data)
+    except GraphAPIError as e:
+        print("Image Post Error:", e)
         return None
+    print("Image Post Response:", response_json)
+    # Extract and return the post_id (not the image id)
+    return response_json.get("post_id")
+
+def post_image_with_comment(page_id, page_access_token, post, image_url):
+    """
+    Posts the image and the comment under it in one Graph batch request, the comment
+    targeting the post_id of the photo call. Returns the post_id, or None if the photo
+    could not be posted. Raises GraphAPIError if the batch request itself failed.
+    """
+    photo, comment = get_client().batch([
+        {"method": "POST", "name": "photo", "relative_url": f"{page_id}/photos",
+         "body": {"caption": post, "url": image_url}},
+        {"method": "POST", "relative_url": "{result=photo:$.post_id}/comments",
+         "body": {"message": COMMENT_MESSAGE}},
+    ], page_access_token)
+    if isinstance(photo, GraphAPIError):
+        print("Image Post Error:", photo)
+        return None
+    print("Image Post Response:", photo)
+    print("Comment Post Response:", comment)
+    return photo.get("post_id")
 
 def post_to_facebook(post, image_url):
-    page_id = os.getenv("PAGE_ID")
-    page_access_token = os.getenv("PAGE_ACCESS_TOKEN")
     """
-    Coordinates the workflow of:
-      1) Posting an image with a caption to the Facebook Page.
-      2) Waiting 10 seconds.
-      3) Commenting on the post using the post_id from the image post.
+    Posts an image with a caption to the Facebook Page and comments on the new post,
+    both in one batch request. Falls back to two calls only if the batch request was
+    rejected outright (4xx), since any other failure may already have posted the image.
+    Returns the post_id.
     """
+    page_id = os.getenv("PAGE_ID")
+    page_access_token = os.getenv("PAGE_ACCESS_TOKEN")
+    try:
+        return post_image_with_comment(page_id, page_access_token, post, image_url)
+    except GraphAPIError as e:
+        if e.status is None or not 400 <= e.status < 500:
+            print("Batch request failed:", e)
+            return None
+        print("Batch request rejected, posting the image and comment separately:", e)
+
     # 1. Post the image and retrieve the post_id.
     post_id = post_image(page_id, page_access_token, post, image_url)
     
-    # 2. Wait 10 seconds before posting the comment.
-    time.sleep(10)
-    
-    # 3. Post a comment using the returned post_id.
+    # 2. Post a comment using the returned post_id.
     if post_id:
         post_comment(post_id, page_access_token)
     else:
         print("Post ID not available, skipping comment post.")
+    return post_id
@@ -1,11 +1,17 @@
-import requests
 import os
+from .graph import get_client
+from .polling import PollState, poll_status
 
 class FacebookStory:
     BASE_GRAPH_URL = "https://graph.facebook.com/v22.0"
     BASE_UPLOAD_URL = "https://rupload.facebook.com/video-upload/v22.0"
 
-    def __init__(self):
+    def __init__(self, poll_deadline=100, upload_deadline=30):
+        # Reels: upload_deadline bounds the wait for the upload before the finish call,
+        # poll_deadline the wait for processing and publishing after it.
+        self.poll_deadline = poll_deadline
+        self.upload_deadline = upload_deadline
+        self.client = get_client()
         self.page_id = os.getenv("PAGE_ID")
         self.page_access_token = os.getenv("PAGE_ACCESS_TOKEN")
         
@@ -23,7 +29,7 @@ class FacebookStory:
             "access_token": self.page_access_token
         }
 
-        response = requests.post(url, data=params).json()
+        response = self.client.post(url, data=params)
         return response.get('video_id'), response.get('upload_url')
 
     def upload_story_video(self, upload_url, hosted_file_url):
@@ -32,9 +38,18 @@ class FacebookStory:
             "file_url": hosted_file_url
         }
 
-        response = requests.post(upload_url, headers=headers).json()
+        response = self.client.post(upload_url, headers=headers)
         return response.get("success", False)
 
+    def share_story(self, hosted_file_url):
+        """Full story flow (start, upload from URL, finish). Returns the post id, or None on failure."""
+        video_id, upload_url = self.init_story_upload()
+        if not video_id or not self.upload_story_video(upload_url, hosted_file_url):
+            print("Facebook Story upload failed")
+            return None
+        success, post_id = self.publish_story(video_id)
+        return post_id if success else None
+
     def publish_story(self, video_id):
         url = f"{self.BASE_GRAPH_URL}/{self.page_id}/video_stories"
         params = {
@@ -43,7 +58,7 @@ class FacebookStory:
             "access_token": self.page_access_token
         }
 
-        response = requests.post(url, data=params).json()
+        response = self.client.post(url, data=params)
         return response.get("success", False), response.get("post_id")
 
     # ======================
@@ -57,7 +72,7 @@ class FacebookStory:
             "access_token": self.page_access_token
         }
 
-        response = requests.post(url, json=params).json()
+        response = self.client.post(url, json=params)
         return response.get('video_id'), response.get('upload_url')
 
     def upload_reel_video(self, video_id, hosted_file_url):
@@ -67,7 +82,7 @@ class FacebookStory:
             "file_url": hosted_file_url
         }
 
-        response = requests.post(upload_url, headers=headers).json()
+        response = self.client.post(upload_url, headers=headers)
         return response.get("success", False)
 
     def check_video_status(self, video_id):
@@ -77,9 +92,57 @@ class FacebookStory:
             "access_token": self.page_access_token
         }
 
-        response = requests.get(url, params=params).json()
+        response = self.client.get(url, params=params)
         return response.get('status', {})
 
+    @staticmethod
+    def _failed(status):
+        """ERROR/EXPIRED when the video or any of its phases failed, else None."""
+        video_status = status.get('video_status')
+        phases = ('uploading_phase', 'processing_phase', 'publishing_phase')
+        if video_status == 'error' or any((status.get(phase) or {}).get('status') == 'error' for phase in phases):
+            return PollState.ERROR
+        if video_status == 'expired':
+            return PollState.EXPIRED
+        return None
+
+    @classmethod
+    def classify_upload(cls, status):
+        """
+        Polling state of a reel before the finish call: done once the upload is complete.
+        Processing only starts with the finish call, so it is not waited for here.
+        """
+        failed = cls._failed(status)
+        if failed:
+            return failed
+        uploading = status.get('uploading_phase')
+        if uploading:
+            done = uploading.get('status') == 'complete'
+        else:
+            done = status.get('video_status') in ('upload_complete', 'ready')
+        return PollState.FINISHED if done else PollState.PENDING
+
+    @classmethod
+    def classify_status(cls, status):
+        """Polling state of a reel after the finish call: done once processed and published."""
+        failed = cls._failed(status)
+        if failed:
+            return failed
+        publishing = (status.get('publishing_phase') or {}).get('status')
+        processed = status.get('video_status') == 'ready' or \
+            (status.get('processing_phase') or {}).get('status') == 'complete'
+        if processed and publishing in (None, 'complete'):
+            return PollState.FINISHED
+        return PollState.PENDING
+
+    def wait_for_video(self, video_id, classify, deadline):
+        """Polls check_video_status until classify gives a terminal state or the deadline passes."""
+        state, _ = poll_status(
+            lambda: self.check_video_status(video_id), classify,
+            deadline=deadline, label=f"Facebook video {video_id}"
+        )
+        return state
+
     def publish_reel(self, video_id, description=""):
         url = f"{self.BASE_GRAPH_URL}/{self.page_id}/video_reels"
         params = {
@@ -90,5 +153,32 @@ class FacebookStory:
             "description": description
         }
 
-        response = requests.post(url, params=params).json()
-        return response.get('success', False), response.get('post_id')
\ No newline at end of file
+        response = self.client.post(url, params=params)
+        return response.get('success', False), response.get('post_id')
+
+    def share_reel(self, hosted_file_url, description=""):
+        """
+        Full reel flow: start, upload from URL, wait for the upload to complete, finish
+        (which starts processing and publishing), then confirm the result by polling.
+        Returns the post id, or None on failure.
+        """
+        video_id, _ = self.init_reel_upload()
+        if not video_id or not self.upload_reel_video(video_id, hosted_file_url):
+            print("Facebook Reel upload failed")
+            return None
+        state = self.wait_for_video(video_id, self.classify_upload, self.upload_deadline)
+        if state != PollState.FINISHED:
+            print(f"Facebook Reel upload not complete ({state.value})")
+            return None
+        success, post_id = self.publish_reel(video_id, description)
+        if not success:
+            print("Facebook Reel publish failed")
+            return None
+        state = self.wait_for_video(video_id, self.classify_status, self.poll_deadline)
+        if state in (PollState.ERROR, PollState.EXPIRED):
+            print(f"Facebook Reel processing failed ({state.value})")
+            return None
+        if state == PollState.TIMEOUT:
+            # Accepted by the finish call; Facebook keeps processing it after we stop polling.
+            print(f"Facebook Reel {video_id} still processing after {self.poll_deadline}s")
+        return post_id or video_id
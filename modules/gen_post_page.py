@@ -1,58 +1,60 @@
 import os
-import random
+import re
 import json
+import random
 from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
 import boto3
 from openai import OpenAI
+from .listing import ListingManifest
+from .history import PostedHistory
+from .instrumentation import stage
 
 # Set your OpenAI API key from an environment variable or directly.
 client = OpenAI(
     api_key=os.environ.get('OPENAI_API_KEY'),
 )
 
-URL_FILE = "url.json"
-
-def load_posted_urls(file_path):
-    """
-    Loads the list of previously posted image URLs from a JSON file.
-    If the file doesn't exist or is empty, returns an empty list.
-    """
-    if os.path.exists(file_path):
-        try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-                if isinstance(data, list):
-                    return data
-        except json.JSONDecodeError:
-            return []
-    return []
+HISTORY_FILE = "posted_history.log"
+# Optional directory for persisted S3 listing manifests (see listing.py)
+LISTING_MANIFEST_DIR = os.environ.get('LISTING_MANIFEST_DIR') or None
+# Book name / description of every filename seen so far
+FILENAME_CACHE_FILE = "parsed_filenames.json"
+# Ready-to-post (image URL, caption) entries generated ahead of time
+CAPTION_QUEUE_FILE = "caption_queue.json"
+CAPTION_QUEUE_SIZE = 3
+BUCKET_NAME = "lily-images"
+FOLDER_PREFIX = "pages/"  # e.g., "coloring-books/"
+# "<number>_<book name>_book_<description>.<ext>"
+FILENAME_PATTERN = re.compile(r'^\d+_(.+?)_book_(.+)\.\w+$')
 
-def save_posted_urls(file_path, urls):
+def get_unposted_image_urls(bucket_name, folder_prefix, posted_urls=None):
     """
-    Saves the list of posted image URLs to a JSON file.
+    Lists objects in the specified S3 bucket folder and returns the full URLs of those
+    that have not been posted before (if posted_urls is provided; a PostedHistory
+    or any other container supporting `in`).
     """
-    with open(file_path, 'w') as f:
-        json.dump(urls, f)
-
-def get_random_image_url(bucket_name, folder_prefix, posted_urls=None):
-    """
-    Lists objects in the specified S3 bucket folder and returns a random image URL 
-    that has not been posted before (if posted_urls is provided).
-    """
-    s3 = boto3.client('s3')
-    response = s3.list_objects_v2(Bucket=bucket_name, Prefix=folder_prefix)
-    objects = response.get('Contents', [])
+    with stage('s3_list'):
+        listing = ListingManifest(boto3.client('s3'), LISTING_MANIFEST_DIR)
+        objects = listing.list(bucket_name, folder_prefix)
     if not objects:
         raise Exception("No objects found in the specified bucket folder.")
     
     # Build a list of full URLs that have not been posted yet.
     new_urls = []
     for obj in objects:
-        key = obj['Key']
+        key = obj['key']
         url = f"https://{bucket_name}.s3.amazonaws.com/{key}"
         if posted_urls is None or url not in posted_urls:
             new_urls.append(url)
-    
+    return new_urls
+
+def get_random_image_url(bucket_name, folder_prefix, posted_urls=None):
+    """
+    Returns a random image URL from the specified S3 bucket folder
+    that has not been posted before (if posted_urls is provided).
+    """
+    new_urls = get_unposted_image_urls(bucket_name, folder_prefix, posted_urls)
     if not new_urls:
         raise Exception("No new images found that haven't been posted yet.")
     
@@ -67,6 +69,43 @@ def extract_filename(image_url):
     filename = os.path.basename(parsed_url.path)
     return filename
 
+def parse_filename(filename):
+    """
+    Splits a filename following the page naming convention into (book name, image description)
+    without any API call, e.g. "10_magic_dragons_book_a_bright_dragon.jpeg" gives
+    ("Magic Dragons", "a_bright_dragon"). Returns None for names that do not follow it.
+    """
+    match = FILENAME_PATTERN.match(filename)
+    if not match:
+        return None
+    book_name = ' '.join(word[:1].upper() + word[1:] for word in match.group(1).split('_') if word)
+    return book_name, match.group(2)
+
+def describe_filename(filename, cache_file=FILENAME_CACHE_FILE):
+    """
+    Returns (book name, image description) for a filename: from the cache, the local parser,
+    or, for names the parser cannot handle, the two ChatGPT calls. New results are cached.
+    """
+    cache = {}
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'r') as f:
+                cache = json.load(f)
+        except json.JSONDecodeError:
+            cache = {}
+    if filename in cache:
+        return tuple(cache[filename])
+
+    parsed = parse_filename(filename)
+    if parsed is None:
+        print(f"Filename '{filename}' does not follow the naming convention, asking ChatGPT.")
+        parsed = (get_book_name_from_filename(filename), get_image_description_from_filename(filename))
+
+    cache[filename] = list(parsed)
+    with open(cache_file, 'w') as f:
+        json.dump(cache, f, indent=1)
+    return parsed
+
 def get_book_name_from_filename(filename):
     """
     Calls ChatGPT to extract the book name from the filename.
@@ -80,14 +119,15 @@ def get_book_name_from_filename(filename):
         "Provide only the book name."
     )
     
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        temperature=0,
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant that extracts book names from filenames."},
-            {"role": "user", "content": prompt}
-        ]
-    )
+    with stage('openai'):
+        response = client.chat.completions.create(
+            model="gpt-4o-mini",
+            temperature=0,
+            messages=[
+                {"role": "system", "content": "You are a helpful assistant that extracts book names from filenames."},
+                {"role": "user", "content": prompt}
+            ]
+        )
     book_name = response.choices[0].message.content.strip()
     return book_name
 
@@ -105,14 +145,15 @@ def get_image_description_from_filename(filename):
         "Provide only the image description exactly as it appears."
     )
     
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        temperature=0,
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant that extracts image descriptions from filenames."},
-            {"role": "user", "content": prompt}
-        ]
-    )
+    with stage('openai'):
+        response = client.chat.completions.create(
+            model="gpt-4o-mini",
+            temperature=0,
+            messages=[
+                {"role": "system", "content": "You are a helpful assistant that extracts image descriptions from filenames."},
+                {"role": "user", "content": prompt}
+            ]
+        )
     description = response.choices[0].message.content.strip()
     return description
 
@@ -130,43 +171,111 @@ def generate_instagram_post(book_name, image_description):
         "Include the hashtag #lily_one_zero in the post."
     )
     
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        temperature=0.7,
-        messages=[
-            {"role": "system", "content": "You are a creative copywriter skilled in generating engaging social media content."},
-            {"role": "user", "content": prompt}
-        ]
-    )
+    with stage('openai'):
+        response = client.chat.completions.create(
+            model="gpt-4o-mini",
+            temperature=0.7,
+            messages=[
+                {"role": "system", "content": "You are a creative copywriter skilled in generating engaging social media content."},
+                {"role": "user", "content": prompt}
+            ]
+        )
     
     post_content = response.choices[0].message.content.strip()
     return post_content
 
+def load_caption_queue(queue_file=CAPTION_QUEUE_FILE):
+    """
+    Loads the queued posts (dicts with image_url, book_name, image_description, caption).
+    If the file doesn't exist or is unreadable, returns an empty list.
+    """
+    if os.path.exists(queue_file):
+        try:
+            with open(queue_file, 'r') as f:
+                data = json.load(f)
+                if isinstance(data, list):
+                    return data
+        except json.JSONDecodeError:
+            return []
+    return []
+
+def save_caption_queue(queue, queue_file=CAPTION_QUEUE_FILE):
+    tmp_file = queue_file + ".tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump(queue, f, indent=1)
+    os.replace(tmp_file, queue_file)
+
+def pop_queued_post(posted_urls, queue_file=CAPTION_QUEUE_FILE):
+    """
+    Removes and returns the first queued post whose image has not been posted since it
+    was queued, or None when the queue has nothing usable.
+    """
+    queue = load_caption_queue(queue_file)
+    entry = None
+    while queue and entry is None:
+        candidate = queue.pop(0)
+        if candidate.get('caption') and candidate['image_url'] not in posted_urls:
+            entry = candidate
+    save_caption_queue(queue, queue_file)
+    return entry
+
+def refill_caption_queue(size=CAPTION_QUEUE_SIZE, queue_file=CAPTION_QUEUE_FILE, max_workers=4):
+    """
+    Tops the caption queue up to size entries for random unposted, not yet queued images.
+    Names are parsed first (one at a time, they share the filename cache), then the captions
+    are generated concurrently. Returns the number of entries added.
+    """
+    with stage('history'):
+        posted_urls = PostedHistory(HISTORY_FILE)
+    queue = [entry for entry in load_caption_queue(queue_file) if entry['image_url'] not in posted_urls]
+    missing = size - len(queue)
+    if missing <= 0:
+        return 0
+    queued = {entry['image_url'] for entry in queue}
+    candidates = [url for url in get_unposted_image_urls(BUCKET_NAME, FOLDER_PREFIX, posted_urls) if url not in queued]
+    entries = []
+    for image_url in random.sample(candidates, min(missing, len(candidates))):
+        book_name, image_description = describe_filename(extract_filename(image_url))
+        entries.append({'image_url': image_url, 'book_name': book_name, 'image_description': image_description})
+
+    def caption(entry):
+        try:
+            entry['caption'] = generate_instagram_post(entry['book_name'], entry['image_description'])
+        except Exception as e:
+            print(f"Could not pre-generate a caption for {entry['image_url']}: {e}")
+        return entry
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(entries) or 1))) as pool:
+        ready = [entry for entry in pool.map(caption, entries) if entry.get('caption')]
+    save_caption_queue(queue + ready, queue_file)
+    print(f"Caption queue: {len(queue) + len(ready)} ready ({len(ready)} added).")
+    return len(ready)
+
 def main():
-    bucket_name = "lily-images"
-    folder_prefix = "pages/"  # e.g., "coloring-books/"
-    
-    # Load list of already posted URLs.
-    posted_urls = load_posted_urls(URL_FILE)
-    
-    # Step 1: Retrieve a random new image URL from the S3 bucket folder.
-    image_url = get_random_image_url(bucket_name, folder_prefix, posted_urls)
-    
-    # Save the new image URL into the JSON file to prevent future duplicates.
-    posted_urls.append(image_url)
-    save_posted_urls(URL_FILE, posted_urls)
-    
-    # Step 2: Extract the filename from the image URL.
-    filename = extract_filename(image_url)
-    
-    # Step 3: Retrieve the book name from the filename via ChatGPT.
-    book_name = get_book_name_from_filename(filename)
-    
-    # Step 4: Retrieve the image description from the filename via ChatGPT.
-    image_description = get_image_description_from_filename(filename)
+    # Load the history of already posted URLs.
+    with stage('history'):
+        posted_urls = PostedHistory(HISTORY_FILE)
     
-    # Step 5: Dynamically generate the Instagram post using ChatGPT.
-    post = generate_instagram_post(book_name, image_description)
+    # Prefer a post whose caption was generated ahead of time (no ChatGPT call now).
+    queued = pop_queued_post(posted_urls)
+    if queued:
+        image_url, post = queued['image_url'], queued['caption']
+        posted_urls.add(image_url)
+    else:
+        # Step 1: Retrieve a random new image URL from the S3 bucket folder.
+        image_url = get_random_image_url(BUCKET_NAME, FOLDER_PREFIX, posted_urls)
+        
+        # Append the new image URL to the history to prevent future duplicates.
+        posted_urls.add(image_url)
+        
+        # Step 2: Extract the filename from the image URL.
+        filename = extract_filename(image_url)
+        
+        # Steps 3 & 4: Book name and image description, parsed locally (ChatGPT only for unusual names).
+        book_name, image_description = describe_filename(filename)
+        
+        # Step 5: Dynamically generate the Instagram post using ChatGPT.
+        post = generate_instagram_post(book_name, image_description)
     
     # Final outcome: Print and return the post text and full image URL.
     print("Instagram Post:")
@@ -177,4 +286,4 @@ def main():
     return post, image_url
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
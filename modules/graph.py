@@ -0,0 +1,156 @@
+import re
+import json
+import threading
+from urllib.parse import quote_plus
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .instrumentation import stage
+
+##############################
+# --- Graph API Client ---
+##############################
+#
+# One pooled, keep-alive Session for every call to graph.facebook.com and rupload.facebook.com,
+# with timeouts on every request and a retry policy for transient failures:
+#   - GET requests are retried on 429/5xx responses and read errors (honouring Retry-After);
+#   - POST requests are only retried when the connection could not be established, since
+#     a POST that reached the server may already have published something.
+# Every failure surfaces as a GraphAPIError.
+#
+# batch() sends several calls in a single HTTP round trip. A call can depend on an earlier
+# named call by referencing its result with JSONPath, e.g. "{result=photo:$.post_id}/comments".
+
+_RESULT_REFERENCE = re.compile(r'\{result=[^}]+\}')
+
+
+class GraphAPIError(Exception):
+    """A failed Graph API call: HTTP status, Graph error code/type/message and the raw payload."""
+
+    def __init__(self, message, status=None, code=None, error_type=None, payload=None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.code = code
+        self.error_type = error_type
+        self.payload = payload
+
+    def __str__(self):
+        details = ", ".join(f"{k}={v}" for k, v in (("status", self.status), ("code", self.code),
+                                                     ("type", self.error_type)) if v is not None)
+        return f"{self.message} ({details})" if details else self.message
+
+
+class GraphClient:
+    BASE_URL = "https://graph.facebook.com/v22.0"
+
+    def __init__(self, timeout=(5, 60), retries=3, backoff_factor=1.0, pool_size=16):
+        self.timeout = timeout
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def url(self, path):
+        """Absolute URL for a Graph path ("<id>/media") or an absolute URL passed through."""
+        if path.startswith(("http://", "https://")):
+            return path
+        return f"{self.BASE_URL}/{path.lstrip('/')}"
+
+    def request(self, method, path, timeout=None, **kwargs):
+        """Sends the request and returns the decoded JSON body, or raises GraphAPIError."""
+        with stage('graph_api') as counters:
+            try:
+                response = self.session.request(method, self.url(path), timeout=timeout or self.timeout, **kwargs)
+            except requests.RequestException as e:
+                raise GraphAPIError(f"{method} {path} failed: {e}") from e
+            counters['bytes'] = len(response.content)
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = None
+
+        error = payload.get("error") if isinstance(payload, dict) else None
+        if error or not response.ok or payload is None:
+            if isinstance(error, dict):
+                raise GraphAPIError(error.get("message", "Graph API error"), status=response.status_code,
+                                    code=error.get("code"), error_type=error.get("type"), payload=payload)
+            raise GraphAPIError(f"{method} {path} returned {response.status_code}: {response.text[:200]}",
+                                status=response.status_code, payload=payload)
+        return payload
+
+    @staticmethod
+    def _encode_body(body):
+        """Form-encodes a batch call body, leaving {result=...} references intact."""
+        return "&".join(
+            f"{quote_plus(str(k))}={v if isinstance(v, str) and _RESULT_REFERENCE.fullmatch(v) else quote_plus(str(v))}"
+            for k, v in body.items()
+        )
+
+    def batch(self, calls, access_token, **kwargs):
+        """
+        Sends calls in one Graph batch request. Each call is a dict with method, relative_url and
+        optionally body (a dict), name and omit_response_on_success. Returns one entry per call,
+        in order: the decoded body, or a GraphAPIError when that call failed or was skipped
+        because a call it depends on failed.
+        """
+        items = []
+        for call in calls:
+            item = {key: value for key, value in call.items() if key != 'body'}
+            if 'name' in item:
+                # Keep the results of referenced calls in the response (Graph omits them by default).
+                item.setdefault('omit_response_on_success', False)
+            if call.get('body'):
+                item['body'] = self._encode_body(call['body'])
+            items.append(item)
+        responses = self.post("", data={"batch": json.dumps(items), "access_token": access_token,
+                                        "include_headers": "false"}, **kwargs)
+        results = []
+        for call, response in zip(calls, responses):
+            name = call.get('name') or call['relative_url']
+            if response is None:
+                results.append(GraphAPIError(f"batch call {name} was not executed"))
+                continue
+            try:
+                body = json.loads(response.get('body') or 'null')
+            except ValueError:
+                body = None
+            error = body.get('error') if isinstance(body, dict) else None
+            if response.get('code') != 200 or error:
+                error = error if isinstance(error, dict) else {}
+                results.append(GraphAPIError(error.get('message', f"batch call {name} failed"),
+                                             status=response.get('code'), code=error.get('code'),
+                                             error_type=error.get('type'), payload=body))
+            else:
+                results.append(body)
+        return results
+
+    def get(self, path, params=None, **kwargs):
+        return self.request("GET", path, params=params, **kwargs)
+
+    def post(self, path, data=None, json=None, params=None, headers=None, **kwargs):
+        return self.request("POST", path, data=data, json=json, params=params, headers=headers, **kwargs)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide GraphClient shared by all publishers."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GraphClient()
+        return _client
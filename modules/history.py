@@ -0,0 +1,106 @@
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; writes are then unlocked
+    fcntl = None
+
+##############################
+# --- Posted History ---
+##############################
+#
+# Append-only log of posted image URLs, one per line, held in memory as an insertion-ordered
+# dict for O(1) membership checks. A line starting with "- " withdraws a URL. Appends take
+# an exclusive lock and first read whatever other processes appended since the file was
+# loaded, so concurrent posters never overwrite or duplicate each other's entries. The log
+# is rewritten (compacted) once withdrawn entries make up a large share of it.
+
+
+class PostedHistory:
+    def __init__(self, path, compact_ratio=0.5):
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self.urls = {}
+        self.lines = 0
+        self.offset = 0
+        self.inode = None
+        with self._locked():
+            self._read_new()
+
+    @contextmanager
+    def _locked(self):
+        with open(self.path + '.lock', 'a') as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read_new(self):
+        """Applies the lines appended since the last read."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_ino != self.inode or stat.st_size < self.offset:
+                # Compacted by another process since the last read: start over.
+                self.urls, self.lines, self.offset, self.inode = {}, 0, 0, stat.st_ino
+            f.seek(self.offset)
+            data = f.read()
+        # A torn last line (writer still appending) is picked up on the next read.
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].decode('utf-8').splitlines():
+            if line.startswith('- '):
+                self.urls.pop(line[2:], None)
+            elif line:
+                self.urls[line] = None
+            self.lines += 1
+        self.offset += end
+
+    def _append(self, line):
+        with self._locked():
+            self._read_new()
+            with open(self.path, 'ab') as f:
+                f.write((line + '\n').encode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
+            self._read_new()
+            if self.lines > 16 and len(self.urls) < self.lines * self.compact_ratio:
+                self._rewrite(list(self.urls))
+
+    def _rewrite(self, urls):
+        """Atomically replaces the log with one line per live URL (caller holds the lock)."""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(url + '\n' for url in urls)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._read_new()
+
+    def __contains__(self, url):
+        return url in self.urls
+
+    def __len__(self):
+        return len(self.urls)
+
+    def add(self, url):
+        """Records url as posted (no-op if it already is)."""
+        if url in self.urls:
+            return
+        self._append(url)
+
+    def discard(self, url):
+        """Withdraws url, making it eligible for posting again."""
+        if url not in self.urls:
+            return
+        self._append('- ' + url)
+
+    def compact(self):
+        """Rewrites the log without withdrawn or duplicate entries."""
+        with self._locked():
+            self._read_new()
+            self._rewrite(list(self.urls))
@@ -1,11 +1,13 @@
-import requests
-import time
 import os
+from .graph import get_client
+from .polling import PollState, poll_status
 
 class InstaStory:
     BASE_URL = "https://graph.facebook.com/v22.0"
 
-    def __init__(self):
+    def __init__(self, poll_deadline=100):
+        self.poll_deadline = poll_deadline
+        self.client = get_client()
         self.ig_user_id = os.getenv('IG_ID')
         self.user_access_token = os.getenv('USER_ACCESS_TOKEN')
         
@@ -22,8 +24,7 @@ class InstaStory:
         if caption:
             payload["caption"] = caption
 
-        response = requests.post(url, data=payload)
-        data = response.json()
+        data = self.client.post(url, data=payload)
         print(f"Created {media_type} container:", data)
         return data.get("id")
 
@@ -34,8 +35,7 @@ class InstaStory:
             "access_token": self.user_access_token
         }
 
-        response = requests.post(url, data=payload)
-        data = response.json()
+        data = self.client.post(url, data=payload)
         print(f"Published media with container {container_id}:", data)
         return data.get("id")
 
@@ -46,38 +46,39 @@ class InstaStory:
             "access_token": self.user_access_token
         }
 
-        response = requests.get(url, params=params)
-        data = response.json()
+        data = self.client.get(url, params=params)
         print(f"Status for container {container_id}:", data)
         return data.get("status_code")
 
+    @staticmethod
+    def classify_status(status_code):
+        """Maps a container status_code onto the shared polling states."""
+        if status_code in ("FINISHED", "PUBLISHED"):
+            return PollState.FINISHED
+        if status_code == "ERROR":
+            return PollState.ERROR
+        if status_code == "EXPIRED":
+            return PollState.EXPIRED
+        return PollState.PENDING
+
+    def wait_and_publish(self, container_id):
+        """Polls the container until it is processed (or the deadline passes), then publishes it."""
+        state, _ = poll_status(
+            lambda: self.get_media_status(container_id), self.classify_status,
+            deadline=self.poll_deadline, label=f"Instagram container {container_id}"
+        )
+        if state in (PollState.ERROR, PollState.EXPIRED):
+            print("Error during media processing.")
+            return None
+        # On timeout, still try: publishing fails cleanly if the container is not ready.
+        return self.publish_media(container_id)
+
     def publish_reel(self, video_url, caption=None):
         container_id = self.create_media_container(video_url, "REELS", caption)
-
         if container_id:
-            time.sleep(15)
-            # Optionally check status before publishing
-            for _ in range(8):
-                status = self.get_media_status(container_id)
-                if status == "FINISHED":
-                    break
-                elif status == "ERROR":
-                    print("Error during media processing.")
-                    return None
-                time.sleep(10)  # Wait 10 sec before retrying
-            return self.publish_media(container_id)
+            return self.wait_and_publish(container_id)
 
     def publish_story(self, video_url):
         container_id = self.create_media_container(video_url, "STORIES")
-
         if container_id:
-            time.sleep(15)
-            for _ in range(8):
-                status = self.get_media_status(container_id)
-                if status == "FINISHED":
-                    break
-                elif status == "ERROR":
-                    print("Error during media processing.")
-                    return None
-                time.sleep(10)
-            return self.publish_media(container_id)
\ No newline at end of file
+            return self.wait_and_publish(container_id)
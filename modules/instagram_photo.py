@@ -1,11 +1,13 @@
 import os
-import requests
-import json
+from .graph import get_client, GraphAPIError
+from .polling import PollState, poll_status
+from .insta_story import InstaStory
 
 def post_to_instagram(image_url, post):
     """
     Posts an image to Instagram using the provided image URL and caption.
     Retrieves the user access token and Instagram user ID from environment variables.
+    Returns the published media id, or None on failure.
     """
     # Retrieve access token and Instagram user ID from environment variables
     user_access_token = os.getenv('USER_ACCESS_TOKEN')
@@ -14,6 +16,16 @@ def post_to_instagram(image_url, post):
     if not user_access_token or not ig_user_id:
         raise Exception("USER_ACCESS_TOKEN and IG_ID environment variables must be set.")
 
+    client = get_client()
+    try:
+        return publish_batched(client, ig_user_id, user_access_token, image_url, post)
+    except GraphAPIError as e:
+        if e.status is None or not 400 <= e.status < 500:
+            print('---------------------- Failed to post to Instagram ---------------------------')
+            print(e)
+            return None
+        print("Batch request rejected, creating and publishing separately:", e)
+
     # Construct the endpoint URL for creating media
     post_url = f'https://graph.facebook.com/v22.0/{ig_user_id}/media'
 
@@ -24,23 +36,69 @@ def post_to_instagram(image_url, post):
     }
 
     # Post to the Instagram API to create media
-    r = requests.post(post_url, data=payload)
+    try:
+        result = client.post(post_url, data=payload)
+    except GraphAPIError as e:
+        print('---------------------- Failed to post to Instagram ---------------------------')
+        print(e)
+        return None
     print("Create Media Response:")
-    print(r.text)
-
-    result = json.loads(r.text)
-    if 'id' in result:
-        creation_id = result['id']
-        
-        # Construct the endpoint URL for publishing the media
-        second_url = f'https://graph.facebook.com/v22.0/{ig_user_id}/media_publish'
-        second_payload = {
-            'creation_id': creation_id,
-            'access_token': user_access_token
-        }
-        r = requests.post(second_url, data=second_payload)
+    print(result)
+    creation_id = result.get('id')
+    if not creation_id:
+        print('---------------------- Failed to post to Instagram ---------------------------')
+        return None
+    return publish_container(client, ig_user_id, user_access_token, creation_id)
+
+def publish_container(client, ig_user_id, user_access_token, creation_id):
+    """Publishes a created media container. Returns the published media id, or None on failure."""
+    # Construct the endpoint URL for publishing the media
+    second_url = f'https://graph.facebook.com/v22.0/{ig_user_id}/media_publish'
+    second_payload = {
+        'creation_id': creation_id,
+        'access_token': user_access_token
+    }
+    try:
+        published = client.post(second_url, data=second_payload)
+    except GraphAPIError as e:
+        print('---------------------- Failed to post to Instagram ---------------------------')
+        print(e)
+        return None
+    print('---------------------- Posted to Instagram successfully ----------------------')
+    print(published)
+    return published.get('id')
+
+def publish_batched(client, ig_user_id, user_access_token, image_url, post):
+    """
+    Creates and publishes the image container in one batch request. If the container was not
+    ready when the publish call ran, waits for it (see polling.py) and publishes it separately.
+    Returns the published media id, or None on failure.
+    """
+    created, published = client.batch([
+        {"method": "POST", "name": "create", "relative_url": f"{ig_user_id}/media",
+         "body": {"image_url": image_url, "caption": post}},
+        {"method": "POST", "relative_url": f"{ig_user_id}/media_publish",
+         "body": {"creation_id": "{result=create:$.id}"}},
+    ], user_access_token)
+    if isinstance(created, GraphAPIError) or not created.get('id'):
+        print('---------------------- Failed to post to Instagram ---------------------------')
+        print(created)
+        return None
+    print("Create Media Response:")
+    print(created)
+    if not isinstance(published, GraphAPIError):
         print('---------------------- Posted to Instagram successfully ----------------------')
-        print(r.text)
-    else:
+        print(published)
+        return published.get('id')
+
+    creation_id = created['id']
+    print(f"Container {creation_id} not published in the batch ({published}), waiting for it.")
+    state, _ = poll_status(
+        lambda: client.get(creation_id, params={'fields': 'status_code', 'access_token': user_access_token})
+        .get('status_code'),
+        InstaStory.classify_status, deadline=60, label=f"Instagram container {creation_id}"
+    )
+    if state in (PollState.ERROR, PollState.EXPIRED):
         print('---------------------- Failed to post to Instagram ---------------------------')
-        print(r.text)
+        return None
+    return publish_container(client, ig_user_id, user_access_token, creation_id)
@@ -0,0 +1,141 @@
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+##############################
+# --- Run Instrumentation ---
+##############################
+#
+# Named stages (listing, S3 GETs, decode, resize, compositing, encode, upload, Graph API calls,
+# polling...) record, summed over all their calls:
+#   wall_seconds   elapsed time (calls on concurrent threads add up)
+#   cpu_seconds    process CPU time over the same calls (includes other threads running meanwhile)
+#   bytes          bytes moved, as reported by the stage
+#   peak_rss_mb    the process's peak RSS when the stage last finished
+#   rss_growth_mb  how much the stage raised the peak RSS
+# Stages may nest (e.g. 's3_get' inside 'load_images'). Only the standard library is used, so
+# the photo workflow (no numpy/cv2) can import it too.
+#
+#   with stage('s3_get') as s:
+#       data = ...
+#       s['bytes'] = len(data)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux, in bytes on macOS.
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class Instrumentation:
+    def __init__(self):
+        self.started = datetime.now(timezone.utc)
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        self.stages = {}
+        self.lock = threading.Lock()
+
+    def record(self, name, wall_seconds, cpu_seconds=0.0, nbytes=0, calls=1, rss_growth=0.0):
+        """Adds measurements to stage name (for timings taken elsewhere, e.g. by worker threads)."""
+        peak = peak_rss_mb()
+        with self.lock:
+            entry = self.stages.get(name)
+            if entry is None:
+                entry = self.stages[name] = {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'bytes': 0,
+                                             'peak_rss_mb': 0.0, 'rss_growth_mb': 0.0}
+            entry['calls'] += calls
+            entry['wall_seconds'] += wall_seconds
+            entry['cpu_seconds'] += cpu_seconds
+            entry['bytes'] += nbytes
+            entry['rss_growth_mb'] += rss_growth
+            if peak is not None:
+                entry['peak_rss_mb'] = max(entry['peak_rss_mb'], peak)
+
+    @contextmanager
+    def stage(self, name, nbytes=0):
+        """Times the block as one call of stage name; set ['bytes'] on the yielded dict to count bytes."""
+        counters = {'bytes': nbytes}
+        rss = peak_rss_mb()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield counters
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            growth = peak_rss_mb() - rss if rss is not None else 0.0
+            self.record(name, wall, cpu, counters['bytes'], rss_growth=growth)
+
+    def summary(self):
+        """The run so far as a JSON-serializable dict."""
+        with self.lock:
+            stages = {name: {key: round(value, 4) if isinstance(value, float) else value
+                             for key, value in entry.items()}
+                      for name, entry in self.stages.items()}
+        return {
+            'started': self.started.isoformat(timespec='seconds'),
+            'wall_seconds': round(time.perf_counter() - self.wall_start, 3),
+            'cpu_seconds': round(time.process_time() - self.cpu_start, 3),
+            'peak_rss_mb': peak_rss_mb(),
+            'stages': stages,
+        }
+
+    def emit(self, path=None):
+        """Prints the run summary as JSON and also writes it to path when given."""
+        summary = self.summary()
+        text = json.dumps(summary, indent=2)
+        print(f"Run summary: {text}")
+        if path:
+            with open(path, 'w') as f:
+                f.write(text + "\n")
+        return summary
+
+    @contextmanager
+    def profile(self, path=None, top=20):
+        """
+        Runs the block under cProfile when path is given (a no-op otherwise), saves the stats
+        to path (readable with pstats or snakeviz) and prints the top functions by cumulative
+        time. Only the calling thread is profiled.
+        """
+        if not path:
+            yield
+            return
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path)
+            print(f"Profile saved to {path}")
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(top)
+
+
+_instrumentation = None
+_instrumentation_lock = threading.Lock()
+
+
+def get_instrumentation():
+    """The process-wide Instrumentation every module records into."""
+    global _instrumentation
+    with _instrumentation_lock:
+        if _instrumentation is None:
+            _instrumentation = Instrumentation()
+        return _instrumentation
+
+
+def stage(name, nbytes=0):
+    """Context manager timing a block as stage name of the process-wide Instrumentation."""
+    return get_instrumentation().stage(name, nbytes)
@@ -0,0 +1,189 @@
+import math
+
+##############################
+# --- Slideshow Layouts ---
+##############################
+#
+# Every mode of SlideshowGenerator is a layout: a list of tracks drawn in order
+# (later tracks sit on top of earlier ones). A scrolling track is a strip of image
+# tiles moving through a fixed rectangle of the frame:
+#
+#   'source'     'folder1' or 'folder2' (one side of the selected image pairs)
+#   'group'      which slice of the selected pairs feeds the track (default 0)
+#   'axis'       'y' scrolls a column vertically, 'x' scrolls a row horizontally
+#   'tile'       'fit' keeps the aspect ratio, 'square' forces size x size tiles
+#   'size'       cross-axis size in pixels (column width or row height)
+#   'x', 'y'     top-left corner of the track in the frame (default 0)
+#   'extent'     visible length along the scroll axis (default: the frame)
+#   'direction'  'forward', 'reverse', or 'opposite' (reverse only when opposite=True)
+#   'arrange'    reordering of the tiles when opposite=True: 'reverse' or ('rotate', n)
+#
+# A track with 'source': 'single' is the sliding foreground slideshow of mode F.
+# Geometry values are either ints or callables taking (width, height).
+#
+# Layout-level keys:
+#
+#   'pairing'      'basename' pairs identical file names across the two folders,
+#                  'number' pairs by the first number in the file name (and cycles each
+#                  folder on its own when random_choice is off)
+#   'count'        'transitions': one image per transition of the video,
+#                  'fill': enough square tiles to cover the scroll of the first track
+#   'shortfall'    'abort' (default) or 'repeat' when too few pairs exist
+#   'carry_first'  move the first tile of the second track to the end of the first
+
+
+def resolve(value, width, height):
+    """Evaluates a geometry value (an int or a callable of width, height)."""
+    return value(width, height) if callable(value) else value
+
+
+def tile_geometry(track, width, height):
+    """Resize geometry of a scrolling track's tiles (see utils.resize_to_geometry)."""
+    size = resolve(track['size'], width, height)
+    if track.get('tile') == 'square':
+        return ('square', size)
+    return ('width', size) if track['axis'] == 'y' else ('height', size)
+
+
+def source_geometries(width, height):
+    """Maps each source ('folder1', 'folder2', 'single') to the set of tile geometries any layout uses."""
+    geometries = {'folder1': set(), 'folder2': set(), 'single': {('width', width)}}
+    for layout in LAYOUTS.values():
+        for track in layout['tracks']:
+            if track['source'] != 'single':
+                geometries[track['source']].add(tile_geometry(track, width, height))
+    return geometries
+
+
+def _paired_rows(count, row_height, rotate):
+    """Alternating folder1/folder2 rows; each pair of rows shares one group of image pairs."""
+    tracks = []
+    for i in range(count):
+        track = {
+            'source': 'folder1' if i % 2 == 0 else 'folder2',
+            'group': i // 2,
+            'axis': 'x',
+            'tile': 'fit',
+            'size': row_height,
+            'y': lambda w, h, i=i: i * row_height(w, h),
+        }
+        if i % 2:
+            track['direction'] = 'opposite'
+            track['arrange'] = 'reverse'
+        else:
+            track['arrange'] = ('rotate', rotate)
+        tracks.append(track)
+    return tracks
+
+
+def _sixth(w, h):
+    return h // 6
+
+
+def _enlarged_row(w, h):
+    return int(round((h // 6) * 1.3))
+
+
+def _enlarged_column(w, h):
+    return int((w // 4) * 1.3)
+
+
+def _mode_g_row(i):
+    track = {
+        'source': 'folder1' if i % 2 == 0 else 'folder2',
+        'group': i // 2,
+        'axis': 'x',
+        'tile': 'fit',
+        'size': _sixth if i < 5 else (lambda w, h: h - 5 * (h // 6)),
+        'y': lambda w, h: i * (h // 6),
+    }
+    if i in (2, 3):
+        track['direction'] = 'opposite'
+    return track
+
+
+SIX_ROWS = _paired_rows(6, lambda w, h: math.ceil(h / 6), rotate=3)
+
+LAYOUTS = {
+    # Mode A: two rows of full-width pages scrolling up, folder1 on top, folder2 below.
+    'a': {
+        'pairing': 'number',
+        'count': 'transitions',
+        'carry_first': True,
+        'tracks': [
+            {'source': 'folder1', 'axis': 'y', 'tile': 'fit', 'size': lambda w, h: w,
+             'extent': lambda w, h: h // 2},
+            {'source': 'folder2', 'axis': 'y', 'tile': 'fit', 'size': lambda w, h: w,
+             'extent': lambda w, h: h // 2, 'y': lambda w, h: h // 2,
+             'direction': 'opposite', 'arrange': 'reverse'},
+        ],
+    },
+    # Mode B: two columns of squares, side = width // 2.
+    'b': {
+        'pairing': 'number',
+        'count': 'fill',
+        'tracks': [
+            {'source': 'folder1', 'axis': 'y', 'tile': 'square', 'size': lambda w, h: w // 2},
+            {'source': 'folder2', 'axis': 'y', 'tile': 'square', 'size': lambda w, h: w // 2,
+             'x': lambda w, h: w // 2, 'direction': 'opposite', 'arrange': 'reverse'},
+        ],
+    },
+    # Mode C: four columns; the first half of the pairs feeds columns 1 & 2, the rest 3 & 4.
+    'c': {
+        'pairing': 'basename',
+        'count': 'fill',
+        'tracks': [
+            {'source': 'folder1' if i % 2 == 0 else 'folder2', 'group': i // 2,
+             'axis': 'y', 'tile': 'square', 'size': lambda w, h: w // 4,
+             'x': lambda w, h, i=i: i * (w // 4),
+             'direction': 'reverse' if i % 2 else 'forward',
+             'arrange': 'reverse' if i % 2 else ('rotate', 1)}
+            for i in range(4)
+        ],
+    },
+    # Mode D: two outer background columns with two enlarged foreground columns centred on top.
+    'd': {
+        'pairing': 'basename',
+        'count': 'fill',
+        'tracks': [
+            {'source': 'folder1', 'axis': 'y', 'tile': 'square', 'size': lambda w, h: w // 4,
+             'direction': 'opposite'},
+            {'source': 'folder2', 'axis': 'y', 'tile': 'square', 'size': lambda w, h: w // 4,
+             'x': lambda w, h: w - w // 4, 'direction': 'opposite'},
+            {'source': 'folder2', 'group': 1, 'axis': 'y', 'tile': 'square', 'size': _enlarged_column,
+             'x': lambda w, h: (w - 2 * _enlarged_column(w, h)) // 2},
+            {'source': 'folder1', 'group': 1, 'axis': 'y', 'tile': 'square', 'size': _enlarged_column,
+             'x': lambda w, h: (w - 2 * _enlarged_column(w, h)) // 2 + _enlarged_column(w, h)},
+        ],
+    },
+    # Mode E: six horizontal rows, three groups of folder1/folder2 pairs.
+    'e': {
+        'pairing': 'basename',
+        'count': 'transitions',
+        'tracks': SIX_ROWS,
+    },
+    # Mode F: the six rows of mode E behind a single-folder slideshow sliding across the middle.
+    'f': {
+        'pairing': 'basename',
+        'count': 'transitions',
+        'shortfall': 'repeat',
+        'tracks': SIX_ROWS + [{'source': 'single'}],
+    },
+    # Mode G: six rows filling the frame, with rows 3 & 4 repeated as enlarged overlays.
+    'g': {
+        'pairing': 'basename',
+        'count': 'transitions',
+        'tracks': [_mode_g_row(i) for i in range(6)] + [
+            {'source': 'folder2', 'group': 1, 'axis': 'x', 'tile': 'fit', 'size': _enlarged_row,
+             'y': lambda w, h: min(h // 2, h - _enlarged_row(w, h)), 'direction': 'opposite'},
+            {'source': 'folder1', 'group': 1, 'axis': 'x', 'tile': 'fit', 'size': _enlarged_row,
+             'y': lambda w, h: max(0, h // 2 - _enlarged_row(w, h)), 'direction': 'opposite'},
+        ],
+    },
+    # Mode H: four horizontal rows (2 x 2 pairs).
+    'h': {
+        'pairing': 'basename',
+        'count': 'transitions',
+        'tracks': _paired_rows(4, lambda w, h: h // 4, rotate=2),
+    },
+}
@@ -0,0 +1,105 @@
+import os
+import re
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+##############################
+# --- S3 Listing Manifests ---
+##############################
+#
+# list_objects_v2 returns at most 1,000 keys per call, so every listing here is paginated.
+# The result for a (bucket, prefix) is kept in memory for the life of the ListingManifest and,
+# when manifest_dir is set, persisted as JSON (key, size, etag, last_modified) and reused for
+# ttl seconds across runs. An expired manifest is refreshed by re-listing the key ranges
+# between its own shard boundaries in parallel instead of walking the whole prefix page by page.
+#
+# Only boto3 is needed here (the photo workflow does not install numpy/cv2).
+
+
+class ListingManifest:
+    def __init__(self, s3_client, manifest_dir=None, ttl=6 * 3600, max_workers=8, shard_size=1000):
+        self.s3 = s3_client
+        self.manifest_dir = manifest_dir
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self.shard_size = shard_size
+        self.listings = {}
+        self.lock = threading.Lock()
+        if manifest_dir:
+            os.makedirs(manifest_dir, exist_ok=True)
+
+    def _path(self, bucket, prefix):
+        name = re.sub(r'[^A-Za-z0-9]+', '_', f"{bucket}/{prefix}").strip('_') or 'root'
+        return os.path.join(self.manifest_dir, name + '.json')
+
+    def _load(self, bucket, prefix):
+        if not self.manifest_dir:
+            return None
+        try:
+            with open(self._path(bucket, prefix)) as f:
+                manifest = json.load(f)
+            if manifest.get('bucket') == bucket and manifest.get('prefix') == prefix:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def _save(self, manifest):
+        if not self.manifest_dir:
+            return
+        path = self._path(manifest['bucket'], manifest['prefix'])
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+
+    def _list_range(self, bucket, prefix, start_after=None, end_key=None):
+        """Lists every object of prefix with start_after < key <= end_key (either bound optional)."""
+        kwargs = {'Bucket': bucket, 'Prefix': prefix}
+        if start_after:
+            kwargs['StartAfter'] = start_after
+        objects = []
+        for page in self.s3.get_paginator('list_objects_v2').paginate(**kwargs):
+            for obj in page.get('Contents', []):
+                if end_key is not None and obj['Key'] > end_key:
+                    return objects
+                last_modified = obj.get('LastModified')
+                objects.append({
+                    'key': obj['Key'],
+                    'size': obj.get('Size'),
+                    'etag': obj.get('ETag'),
+                    'last_modified': last_modified.isoformat() if hasattr(last_modified, 'isoformat') else last_modified,
+                })
+        return objects
+
+    def _refresh(self, bucket, prefix, previous):
+        """Re-lists the prefix, sharded by the previous manifest's keys when there is one."""
+        keys = [obj['key'] for obj in previous['objects']] if previous else []
+        boundaries = keys[self.shard_size - 1::self.shard_size]
+        if not boundaries:
+            return self._list_range(bucket, prefix)
+        ranges = list(zip([None] + boundaries, boundaries + [None]))
+        workers = max(1, min(self.max_workers, len(ranges)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            shards = pool.map(lambda r: self._list_range(bucket, prefix, r[0], r[1]), ranges)
+        return [obj for shard in shards for obj in shard]
+
+    def list(self, bucket, prefix, refresh=False):
+        """
+        Returns the objects under prefix as dicts (key, size, etag, last_modified), sorted by key.
+        Served from memory or a fresh persisted manifest when possible; refresh forces a re-list.
+        """
+        with self.lock:
+            if not refresh and (bucket, prefix) in self.listings:
+                return self.listings[(bucket, prefix)]
+        previous = self._load(bucket, prefix)
+        if not refresh and previous and time.time() - previous.get('refreshed_at', 0) < self.ttl:
+            objects = previous['objects']
+        else:
+            objects = self._refresh(bucket, prefix, previous)
+            self._save({'bucket': bucket, 'prefix': prefix, 'refreshed_at': time.time(), 'objects': objects})
+        with self.lock:
+            self.listings[(bucket, prefix)] = objects
+        return objects
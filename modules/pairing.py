@@ -0,0 +1,118 @@
+import os
+import re
+import json
+import random
+
+##############################
+# --- Folder Pairing Index ---
+##############################
+#
+# The join of FOLDER1 and FOLDER2 shared by every mode, computed once per listing change
+# instead of on every render:
+#
+#   'basename'  (folder1 key, folder2 key) for every file name present in both folders,
+#               in natural-sort order
+#   'number'    (folder1 key, folder2 key) pairing each folder1 file with the folder2 file
+#               carrying the same number (the first digits of the file name)
+#
+# With index_path set, the index is persisted as JSON together with each object's ETag and
+# numeric id, so later runs only inspect objects that are new or changed.
+
+
+def _file_number(key):
+    m = re.search(r'(\d+)', os.path.basename(key))
+    return int(m.group(1)) if m else None
+
+
+class PairingIndex:
+    def __init__(self, s3_manager, folder1, folder2, index_path=None):
+        self.s3_manager = s3_manager
+        self.folder1 = folder1
+        self.folder2 = folder2
+        self.index_path = index_path
+        self.files1 = []
+        self.files2 = []
+        self.objects = {}
+        self.pairs = {'basename': [], 'number': []}
+        self._load()
+        self.refresh()
+
+    def _load(self):
+        if not self.index_path or not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+        if index.get('folders') != [self.folder1, self.folder2]:
+            return
+        self.files1 = index['files1']
+        self.files2 = index['files2']
+        self.objects = index['objects']
+        self.pairs = {kind: [tuple(pair) for pair in pairs] for kind, pairs in index['pairs'].items()}
+
+    def _save(self):
+        if not self.index_path:
+            return
+        directory = os.path.dirname(self.index_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'folders': [self.folder1, self.folder2],
+                'files1': self.files1,
+                'files2': self.files2,
+                'objects': self.objects,
+                'pairs': self.pairs,
+            }, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _join(self):
+        folder1_map = {os.path.basename(k): k for k in self.files1}
+        folder2_map = {os.path.basename(k): k for k in self.files2}
+        basename_pairs = [
+            (key, folder2_map[os.path.basename(key)]) for key in self.files1
+            if folder1_map[os.path.basename(key)] == key and os.path.basename(key) in folder2_map
+        ]
+        mapping_folder2 = {}
+        for key in self.files2:
+            num = self.objects[key]['number']
+            if num is not None:
+                mapping_folder2[num] = key
+        number_pairs = [
+            (key, mapping_folder2[self.objects[key]['number']]) for key in self.files1
+            if self.objects[key]['number'] in mapping_folder2
+        ]
+        self.pairs = {'basename': basename_pairs, 'number': number_pairs}
+
+    def refresh(self):
+        """Re-reads both listings and updates only the objects and joins that changed."""
+        bucket1, _ = self.s3_manager.parse_s3_path(self.folder1)
+        bucket2, _ = self.s3_manager.parse_s3_path(self.folder2)
+        files1 = self.s3_manager.list_images(self.folder1)
+        files2 = self.s3_manager.list_images(self.folder2)
+
+        objects = {}
+        changed = files1 != self.files1 or files2 != self.files2
+        for bucket, files in ((bucket1, files1), (bucket2, files2)):
+            for key in files:
+                etag = self.s3_manager.etags.get((bucket, key))
+                entry = self.objects.get(key)
+                if entry is None or entry['etag'] != etag:
+                    entry = {'etag': etag, 'number': _file_number(key)}
+                    changed = True
+                objects[key] = entry
+        changed = changed or len(objects) != len(self.objects)
+        self.files1, self.files2, self.objects = files1, files2, objects
+        if not changed:
+            return
+
+        self._join()
+        self._save()
+
+    def sample(self, kind, k):
+        """k distinct pairs of the given kind chosen at random (O(k), without copying the pairs)."""
+        pairs = self.pairs[kind]
+        return [pairs[i] for i in random.sample(range(len(pairs)), k)]
@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+import multiprocessing
+from .encoder import FFmpegWriter, concat_segments
+from .renderer import iter_frames, write_frames
+
+##############################
+# --- Segmented Parallel Rendering ---
+##############################
+#
+# Every frame depends only on its index, so the video is split into contiguous segments,
+# each rendered and encoded to its own H.264 file by a worker process, and the segments are
+# joined with the concat demuxer without re-encoding. Workers are forked after the tracks
+# are built and read the strips from the inherited (copy-on-write) memory instead of having
+# them pickled.
+
+# Set in the parent right before forking; the workers inherit it.
+_SEGMENT_JOB = None
+
+
+def _render_segment(segment):
+    start, end, path = segment
+    job = _SEGMENT_JOB
+    writer = FFmpegWriter(path, job['width'], job['height'], job['fps'], crf=job['crf'],
+                          threads=job['threads'])
+    try:
+        write_frames(writer, iter_frames(job['tracks'], end, job['width'], job['height'],
+                                         job['text_configs'], start=start, block_size=job['block_size']))
+    finally:
+        writer.release()
+    return path
+
+
+def segment_bounds(total_frames, segments):
+    """Splits range(total_frames) into at most segments contiguous (start, end) ranges."""
+    segments = max(1, min(segments, total_frames))
+    size, extra = divmod(total_frames, segments)
+    bounds = []
+    start = 0
+    for i in range(segments):
+        end = start + size + (1 if i < extra else 0)
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+def render_segmented(tracks, total_frames, width, height, fps, output_file, text_configs=None,
+                     audio_file=None, workers=None, block_size=32, crf=23):
+    """
+    Renders total_frames frames of tracks into output_file with one worker process per
+    segment (workers defaults to the number of CPUs), then joins the segments and muxes
+    the audio. Requires the 'fork' start method (Linux).
+    """
+    global _SEGMENT_JOB
+    workers = workers or os.cpu_count() or 1
+    bounds = segment_bounds(total_frames, workers)
+    temp_dir = tempfile.mkdtemp(prefix='segments_', dir=os.path.dirname(os.path.abspath(output_file)))
+    segments = [(start, end, os.path.join(temp_dir, f"segment_{i:03d}.mp4")) for i, (start, end) in enumerate(bounds)]
+
+    _SEGMENT_JOB = {
+        'tracks': tracks, 'width': width, 'height': height, 'fps': fps, 'text_configs': text_configs,
+        'block_size': block_size, 'crf': crf,
+        # Split the CPUs between the concurrent x264 encoders instead of oversubscribing them.
+        'threads': max(1, (os.cpu_count() or 1) // len(segments)),
+    }
+    try:
+        with multiprocessing.get_context('fork').Pool(len(segments)) as pool:
+            paths = pool.map(_render_segment, segments, chunksize=1)
+        concat_segments(paths, output_file, audio_file)
+    finally:
+        _SEGMENT_JOB = None
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    print(f"Rendered {total_frames} frames in {len(segments)} parallel segments")
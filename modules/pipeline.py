@@ -0,0 +1,161 @@
+import time
+import queue
+import threading
+import numpy as np
+from .renderer import render_frame
+from .utils import add_text_overlays
+
+##############################
+# --- Threaded Frame Pipeline ---
+##############################
+#
+# Overlaps the three steps of every frame on separate threads connected by bounded queues:
+#
+#   composite (draw the tracks, N threads) -> overlay (text, in frame order) -> encode (writer)
+#
+# NumPy copies/blends and the encoder pipe write release the GIL for most of their work, so
+# the stages genuinely run side by side. Full queues block the producers (back-pressure),
+# keeping at most a few frames in flight; the overlay stage restores frame order before
+# anything reaches the writer.
+#
+# Frames are drawn into a fixed set of preallocated buffers: a compositor takes a free buffer
+# before claiming a frame index, and the encoder hands it back once the writer has consumed
+# the frame, so the steady state allocates nothing.
+
+_DONE = object()
+
+
+class _Stage:
+    def __init__(self, name):
+        self.name = name
+        self.busy = 0.0
+        self.items = 0
+
+    def timed(self, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        self.busy += time.perf_counter() - start
+        self.items += 1
+        return result
+
+
+def _put(q, item, stop):
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _get(q, stop):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    return _DONE
+
+
+def render_pipelined(tracks, total_frames, width, height, writer, text_configs=None,
+                     composite_workers=2, queue_size=8):
+    """
+    Renders frames 0 .. total_frames - 1 into writer through the threaded pipeline and returns
+    per-stage statistics: {stage: {'frames', 'busy_seconds', 'utilization'}} where utilization
+    is the busy share of the wall time (per thread for the composite stage).
+    Re-raises the first exception raised by any stage.
+    """
+    composite = _Stage('composite')
+    overlay = _Stage('overlay')
+    encode = _Stage('encode')
+    composited = queue.Queue(queue_size)
+    overlaid = queue.Queue(queue_size)
+    stop = threading.Event()
+    errors = []
+    next_frame = iter(range(total_frames))
+    next_lock = threading.Lock()
+    stage_lock = threading.Lock()
+    # Enough buffers to fill both queues plus one per thread holding a frame.
+    free = queue.Queue()
+    for buffer in np.zeros((2 * queue_size + composite_workers + 2, height, width, 3), dtype=np.uint8):
+        free.put(buffer)
+
+    def guarded(func):
+        def run():
+            try:
+                func()
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+        return run
+
+    def compositor():
+        while not stop.is_set():
+            # Take the buffer first: the overlay stage may be waiting for the frame claimed next.
+            buffer = _get(free, stop)
+            if buffer is _DONE:
+                return
+            with next_lock:
+                f = next(next_frame, None)
+            if f is None:
+                break
+            start = time.perf_counter()
+            frame = render_frame(tracks, f, width, height, out=buffer)
+            with stage_lock:
+                composite.busy += time.perf_counter() - start
+                composite.items += 1
+            if not _put(composited, (f, frame), stop):
+                return
+        _put(composited, _DONE, stop)
+
+    def overlayer():
+        pending = {}
+        expected = 0
+        finished = 0
+        while finished < composite_workers:
+            item = _get(composited, stop)
+            if item is _DONE:
+                if stop.is_set():
+                    return
+                finished += 1
+                continue
+            f, frame = item
+            pending[f] = frame
+            while expected in pending:
+                frame = pending.pop(expected)
+                if text_configs:
+                    overlay.timed(add_text_overlays, frame, text_configs)
+                if not _put(overlaid, frame, stop):
+                    return
+                expected += 1
+        _put(overlaid, _DONE, stop)
+
+    def encoder():
+        while True:
+            frame = _get(overlaid, stop)
+            if frame is _DONE:
+                return
+            encode.timed(writer.write, frame)
+            free.put(frame)
+
+    threads = [threading.Thread(target=guarded(compositor), name=f'composite-{i}') for i in range(composite_workers)]
+    threads += [threading.Thread(target=guarded(overlayer), name='overlay'),
+                threading.Thread(target=guarded(encoder), name='encode')]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    if errors:
+        raise errors[0]
+
+    stats = {}
+    for stage, thread_count in ((composite, composite_workers), (overlay, 1), (encode, 1)):
+        stats[stage.name] = {
+            'frames': stage.items,
+            'busy_seconds': round(stage.busy, 3),
+            'utilization': round(stage.busy / (wall * thread_count), 3) if wall > 0 else 0.0,
+        }
+    return stats
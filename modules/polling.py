@@ -0,0 +1,58 @@
+import time
+import random
+from enum import Enum
+from .instrumentation import stage
+
+##############################
+# --- Status Polling ---
+##############################
+#
+# Shared by the Instagram container and Facebook video flows: poll quickly at first (short
+# reels are usually processed within seconds), then back off exponentially with jitter until
+# a terminal state or the overall deadline.
+
+
+class PollState(Enum):
+    PENDING = "pending"      # still processing, keep polling
+    FINISHED = "finished"    # ready to publish
+    ERROR = "error"          # processing failed
+    EXPIRED = "expired"      # the container/upload is no longer usable
+    TIMEOUT = "timeout"      # deadline reached while still pending
+
+
+TERMINAL_STATES = (PollState.FINISHED, PollState.ERROR, PollState.EXPIRED)
+
+
+def poll_status(fetch, classify, deadline=120, initial_delay=1.0, max_delay=15.0, factor=1.8, jitter=0.25,
+                label="status"):
+    """
+    Calls fetch() until classify(status) is terminal or deadline seconds have passed.
+    The first poll is immediate; the wait between polls starts at initial_delay and grows by
+    factor up to max_delay, randomized by +/- jitter. Errors raised by fetch count as a pending
+    poll. Returns (PollState, last status). The whole wait is timed as the 'graph_poll' stage.
+    """
+    with stage('graph_poll'):
+        return _poll(fetch, classify, deadline, initial_delay, max_delay, factor, jitter, label)
+
+
+def _poll(fetch, classify, deadline, initial_delay, max_delay, factor, jitter, label):
+    start = time.monotonic()
+    delay = initial_delay
+    status = None
+    while True:
+        try:
+            status = fetch()
+            state = classify(status)
+        except Exception as e:
+            print(f"Polling {label} failed: {e}")
+            state = PollState.PENDING
+        if state in TERMINAL_STATES:
+            print(f"{label}: {state.value} after {time.monotonic() - start:.1f}s")
+            return state, status
+
+        remaining = deadline - (time.monotonic() - start)
+        if remaining <= 0:
+            print(f"{label}: still pending after {deadline}s")
+            return PollState.TIMEOUT, status
+        time.sleep(min(remaining, delay * random.uniform(1 - jitter, 1 + jitter)))
+        delay = min(delay * factor, max_delay)
@@ -0,0 +1,85 @@
+import time
+import asyncio
+import threading
+from .instrumentation import get_instrumentation
+
+##############################
+# --- Publishing Orchestrator ---
+##############################
+#
+# Runs several blocking publish flows (one per platform/format) at the same time, each under
+# its own deadline, so the wall time is that of the slowest flow instead of their sum.
+# A flow is a zero-argument callable returning the published id (truthy) on success and a
+# falsy value on failure; exceptions are caught and reported as failures.
+#
+# Flows run in daemon threads: a flow that overruns its deadline is reported as timed out
+# and abandoned, without keeping the process alive once everything else is done.
+
+
+def _in_daemon_thread(func):
+    """Runs func in a daemon thread and returns an asyncio future of its result."""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def set_result(result, error):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def target():
+        try:
+            result, error = func(), None
+        except Exception as e:
+            result, error = None, e
+        try:
+            loop.call_soon_threadsafe(set_result, result, error)
+        except RuntimeError:  # loop already closed after a timeout
+            pass
+
+    threading.Thread(target=target, daemon=True).start()
+    return future
+
+
+async def _run_flow(name, func, deadline):
+    start = time.monotonic()
+    result = {'name': name, 'ok': False, 'id': None, 'error': None, 'seconds': 0.0}
+    try:
+        published_id = await asyncio.wait_for(_in_daemon_thread(func), timeout=deadline)
+        result['ok'] = bool(published_id)
+        result['id'] = published_id
+        if not published_id:
+            result['error'] = "flow returned no id"
+    except asyncio.TimeoutError:
+        result['error'] = f"timed out after {deadline}s"
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = round(time.monotonic() - start, 2)
+    return result
+
+
+async def _run_flows(flows, deadlines, default_deadline):
+    return await asyncio.gather(*(
+        _run_flow(name, func, deadlines.get(name, default_deadline)) for name, func in flows.items()
+    ))
+
+
+def publish_all(flows, deadlines=None, default_deadline=300):
+    """
+    Runs every flow of flows (name -> callable) concurrently and returns one result dict per
+    flow, in order: name, ok, id (what the flow returned), error (None or a message), seconds.
+    deadlines optionally maps flow names to their own timeout in seconds.
+    """
+    start = time.monotonic()
+    results = asyncio.run(_run_flows(flows, deadlines or {}, default_deadline))
+    instrumentation = get_instrumentation()
+    for result in results:
+        instrumentation.record(f"publish: {result['name']}", result['seconds'])
+        if result['ok']:
+            print(f"{result['name']} published in {result['seconds']}s: {result['id']}")
+        else:
+            print(f"{result['name']} failed after {result['seconds']}s: {result['error']}")
+    print(f"Published {sum(r['ok'] for r in results)}/{len(results)} in {time.monotonic() - start:.1f}s")
+    return results
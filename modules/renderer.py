@@ -0,0 +1,229 @@
+import threading
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from .utils import add_text_overlays
+
+##############################
+# --- Track Rendering ---
+##############################
+
+def paste(canvas, image, x, y):
+    """Copies image onto canvas with its top-left corner at (x, y), clipped to the canvas."""
+    h, w = image.shape[:2]
+    top, left = max(y, 0), max(x, 0)
+    bottom, right = min(y + h, canvas.shape[0]), min(x + w, canvas.shape[1])
+    if bottom <= top or right <= left:
+        return
+    canvas[top:bottom, left:right] = image[top - y:bottom - y, left - x:right - x]
+
+
+class ScrollTrack:
+    """A VirtualStrip scrolling through a fixed rectangle of the frame."""
+
+    def __init__(self, strip, x, y, extent, speed, reverse=False):
+        self.strip = strip
+        self.x = x
+        self.y = y
+        self.extent = extent
+        self.speed = speed
+        self.reverse = reverse
+        self.thickness = strip.tiles[0].shape[1] if strip.axis == 'y' else strip.tiles[0].shape[0]
+        self._span = None
+
+    def offset(self, f):
+        """Strip offset of the visible window at frame f."""
+        max_offset = self.strip.length - self.extent
+        base_offset = int(f * self.speed)
+        offset = max_offset - base_offset if self.reverse else base_offset
+        return max(0, min(offset, max_offset))
+
+    def offsets(self, start, end):
+        """Strip offsets of frames start .. end - 1 as an array (the same values as offset())."""
+        max_offset = self.strip.length - self.extent
+        base_offsets = (np.arange(start, end) * self.speed).astype(np.int64)
+        offsets = max_offset - base_offsets if self.reverse else base_offsets
+        return np.clip(offsets, 0, max_offset)
+
+    def visible(self, canvas_height, canvas_width):
+        """The (top, bottom, left, right) canvas rectangle the track covers, or None."""
+        if self.strip.axis == 'y':
+            w, h = self.thickness, self.extent
+        else:
+            w, h = self.extent, self.thickness
+        top, left = max(self.y, 0), max(self.x, 0)
+        bottom, right = min(self.y + h, canvas_height), min(self.x + w, canvas_width)
+        if bottom <= top or right <= left:
+            return None
+        return top, bottom, left, right
+
+    def draw(self, canvas, f):
+        """Copies the visible window straight from the strip's tiles into the canvas."""
+        rect = self.visible(*canvas.shape[:2])
+        if rect is None:
+            return
+        top, bottom, left, right = rect
+        dest = canvas[top:bottom, left:right]
+        offset = self.offset(f)
+        if self.strip.axis == 'y':
+            self.strip.copy_window(offset + top - self.y, dest, left - self.x)
+        else:
+            self.strip.copy_window(offset + left - self.x, dest, top - self.y)
+
+    def block(self, start, count, canvas_height, canvas_width):
+        """
+        Prepares frames start .. start + count - 1 and returns draw(canvas, j) for frame
+        start + j. The strip section the whole block scrolls through is gathered from the
+        tiles once; every frame's window is then one slice of it, picked from the block's
+        offset schedule. The span buffer is reused by the next block, so blocks of one
+        track must be drawn one at a time, from one thread.
+        """
+        rect = self.visible(canvas_height, canvas_width)
+        if rect is None:
+            return lambda canvas, j: None
+        top, bottom, left, right = rect
+        offsets = self.offsets(start, start + count)
+        lo = int(offsets.min())
+        y_axis = self.strip.axis == 'y'
+        window = bottom - top if y_axis else right - left
+        cross = right - left if y_axis else bottom - top
+        length = int(offsets.max()) - lo + window
+        shape = (length, cross, 3) if y_axis else (cross, length, 3)
+        size = length * cross * 3
+        if self._span is None or self._span.size < size:
+            self._span = np.empty(size, dtype=np.uint8)
+        span = self._span[:size].reshape(shape)
+        if y_axis:
+            self.strip.copy_window(lo + top - self.y, span, left - self.x)
+            # windows[o] is the (window, cross, 3) view starting o rows into the span.
+            windows = np.moveaxis(sliding_window_view(span, window, axis=0), -1, 1)
+        else:
+            self.strip.copy_window(lo + left - self.x, span, top - self.y)
+            windows = np.moveaxis(np.moveaxis(sliding_window_view(span, window, axis=1), 1, 0), -1, 2)
+        schedule = (offsets - lo).tolist()
+
+        def draw(canvas, j):
+            canvas[top:bottom, left:right] = windows[schedule[j]]
+        return draw
+
+
+class SlideTrack:
+    """
+    Full-width images sliding horizontally into one another, centred vertically.
+    Frame 0 shows the first image; every following frame belongs to a transition.
+    """
+
+    # Padded image pairs kept at once: frames are drawn in order (or nearly, with threads),
+    # so only the current transition and its neighbour are ever needed.
+    PAIR_CACHE_SIZE = 2
+
+    def __init__(self, images, width, height, transition_frames, opposite=False):
+        self.images = images
+        self.width = width
+        self.height = height
+        self.transition_frames = transition_frames
+        self.opposite = opposite
+        self._pairs = {}
+        self._pairs_lock = threading.Lock()
+
+    def padded_pair(self, i):
+        """Images i and i + 1 padded once to their common height on black (cached per pair)."""
+        with self._pairs_lock:
+            pair = self._pairs.get(i)
+            if pair is None:
+                current, nxt = self.images[i], self.images[i + 1]
+                height = max(current.shape[0], nxt.shape[0])
+                pair = np.zeros((2, height, self.width, 3), dtype=np.uint8)
+                for can, image in zip(pair, (current, nxt)):
+                    top = (height - image.shape[0]) // 2
+                    can[top:top + image.shape[0], :self.width] = image
+                while len(self._pairs) >= self.PAIR_CACHE_SIZE:
+                    del self._pairs[max(self._pairs, key=lambda k: abs(k - i))]
+                self._pairs[i] = pair
+            return pair
+
+    def draw(self, canvas, f):
+        if f == 0 or len(self.images) < 2:
+            image = self.images[0]
+            paste(canvas, image, 0, (self.height - image.shape[0]) // 2)
+            return
+        i, t = divmod(f - 1, self.transition_frames)
+        progress = (t + 1) / float(self.transition_frames)
+        can1, can2 = self.padded_pair(i)
+        width = self.width
+        shift = int(progress * width)
+        y = (self.height - can1.shape[0]) // 2
+        # Both halves go straight into the canvas; no intermediate frame is built.
+        if not self.opposite:
+            paste(canvas, can1[:, shift:width], 0, y)
+            paste(canvas, can2[:, :shift], width - shift, y)
+        else:
+            paste(canvas, can1[:, :width - shift], shift, y)
+            paste(canvas, can2[:, width - shift:], 0, y)
+
+    def block(self, start, count, canvas_height, canvas_width):
+        """Returns draw(canvas, j) for frame start + j (transitions are drawn frame by frame)."""
+        return lambda canvas, j: self.draw(canvas, start + j)
+
+
+class FramePool:
+    """
+    A fixed ring of preallocated frame buffers handed out in turn. A buffer is reused after
+    size further frames, so a consumer may hold at most size - 1 frames besides the newest.
+    """
+
+    def __init__(self, width, height, size=2):
+        self.buffers = np.zeros((size, height, width, 3), dtype=np.uint8)
+        self.next_index = 0
+
+    def acquire(self):
+        buffer = self.buffers[self.next_index]
+        self.next_index = (self.next_index + 1) % len(self.buffers)
+        return buffer
+
+
+def render_frame(tracks, f, width, height, text_configs=None, out=None):
+    """
+    Draws every track for frame f onto a black canvas, then the text overlays.
+    The canvas is out (cleared and drawn in place) when given, a new array otherwise.
+    """
+    if out is None:
+        canvas = np.zeros((height, width, 3), dtype=np.uint8)
+    else:
+        canvas = out
+        canvas.fill(0)
+    for track in tracks:
+        track.draw(canvas, f)
+    if text_configs:
+        add_text_overlays(canvas, text_configs)
+    return canvas
+
+
+def iter_frames(tracks, total_frames, width, height, text_configs=None, start=0, pool=None, block_size=32):
+    """
+    Lazily renders frames start .. total_frames - 1 into the buffers of pool (a two-buffer
+    FramePool by default), so the loop allocates nothing per frame. A yielded frame is only
+    valid until the pool comes back round to its buffer: write or copy it, don't keep it.
+    Offsets are scheduled and strip sections gathered per block of block_size frames, while
+    the frames themselves still go out one at a time through the (cache-resident) pool.
+    """
+    pool = pool or FramePool(width, height)
+    for first in range(start, total_frames, block_size):
+        count = min(block_size, total_frames - first)
+        drawers = [track.block(first, count, height, width) for track in tracks]
+        for j in range(count):
+            canvas = pool.acquire()
+            canvas.fill(0)
+            for draw in drawers:
+                draw(canvas, j)
+            if text_configs:
+                add_text_overlays(canvas, text_configs)
+            yield canvas
+
+
+def write_frames(writer, frames):
+    """Hands every frame of an iterable straight to the writer. Returns the number written."""
+    count = 0
+    for frame in frames:
+        writer.write(frame)
+        count += 1
+    return count
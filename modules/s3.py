@@ -1,13 +1,286 @@
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import boto3
 import numpy as np
 import cv2
-from .utils import natural_sort_key
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from .atlas import load_atlas
+from .instrumentation import stage
+from .listing import ListingManifest
+from .utils import natural_sort_key, resize_to_geometry
 
 #from utils import natural_sort_key
 
+class ImageCache:
+    """
+    Run-scoped LRU of decoded images keyed by (bucket, key, geometry), capped by total bytes.
+    Cached arrays are shared between callers, so they are marked read-only.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, cache_key, record=True):
+        """Returns the cached image or None; record=False leaves the hit/miss counters alone."""
+        with self.lock:
+            image = self.entries.get(cache_key)
+            if image is None:
+                if record:
+                    self.misses += 1
+                return None
+            self.entries.move_to_end(cache_key)
+            if record:
+                self.hits += 1
+            return image
+
+    def put(self, cache_key, image):
+        if image is None or image.nbytes > self.max_bytes:
+            return
+        image.setflags(write=False)
+        with self.lock:
+            previous = self.entries.pop(cache_key, None)
+            if previous is not None:
+                self.bytes -= previous.nbytes
+            self.entries[cache_key] = image
+            self.bytes += image.nbytes
+            while self.bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.bytes -= evicted.nbytes
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries), 'bytes': self.bytes}
+
+
+class DiskCache:
+    """
+    Persistent cache of raw S3 object bytes, one file per (bucket, key, ETag), capped by total
+    size with least-recently-used eviction (file mtimes are refreshed on every hit).
+    The directory is scanned once at startup into an in-memory index of each cached key's
+    (ETag, size) in LRU order, so lookups never list the directory.
+    """
+
+    def __init__(self, root, max_bytes=2 * 1024 ** 3):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.bytes = 0
+        os.makedirs(root, exist_ok=True)
+        files = sorted(
+            (e for e in os.scandir(root) if e.is_file() and not e.name.endswith('.tmp')),
+            key=lambda e: e.stat().st_mtime
+        )
+        for entry in files:
+            prefix, _, etag = entry.name.partition('-')
+            # Oldest first, so a leftover older version of a key is replaced by the newer one.
+            if prefix in self.entries:
+                self._remove(prefix)
+            self.entries[prefix] = (etag, entry.stat().st_size)
+            self.bytes += entry.stat().st_size
+        if self.bytes > self.max_bytes:
+            self._evict()
+
+    @staticmethod
+    def _clean_etag(etag):
+        return re.sub(r'[^A-Za-z0-9-]', '', etag or '')
+
+    def _prefix(self, bucket, key):
+        return hashlib.sha256(f"{bucket}/{key}".encode()).hexdigest()
+
+    def _file(self, prefix, etag):
+        return os.path.join(self.root, f"{prefix}-{etag}")
+
+    def _path(self, bucket, key, etag):
+        return self._file(self._prefix(bucket, key), self._clean_etag(etag))
+
+    def get(self, bucket, key, etag):
+        """Returns the cached bytes for this exact ETag, or None."""
+        prefix, etag = self._prefix(bucket, key), self._clean_etag(etag)
+        with self.lock:
+            entry = self.entries.get(prefix)
+            if entry is None or entry[0] != etag:
+                return None
+            self.entries.move_to_end(prefix)
+        path = self._file(prefix, etag)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            # Removed behind our back; forget it.
+            with self.lock:
+                if self.entries.get(prefix) == entry:
+                    del self.entries[prefix]
+                    self.bytes -= entry[1]
+            return None
+
+    def latest_etag(self, bucket, key):
+        """ETag of the cached copy of the key, or None."""
+        with self.lock:
+            entry = self.entries.get(self._prefix(bucket, key))
+        return entry[0] if entry else None
+
+    def put(self, bucket, key, etag, data):
+        if not etag or len(data) > self.max_bytes:
+            return
+        prefix, etag = self._prefix(bucket, key), self._clean_etag(etag)
+        path = self._file(prefix, etag)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self.lock:
+            previous = self.entries.pop(prefix, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+                # Older versions of the same object are never served again.
+                if previous[0] != etag:
+                    self._delete(self._file(prefix, previous[0]))
+            self.entries[prefix] = (etag, len(data))
+            self.bytes += len(data)
+            if self.bytes > self.max_bytes:
+                self._evict()
+
+    @staticmethod
+    def _delete(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _remove(self, prefix):
+        etag, size = self.entries.pop(prefix)
+        self._delete(self._file(prefix, etag))
+        self.bytes -= size
+
+    def _evict(self):
+        while self.bytes > self.max_bytes and self.entries:
+            self._remove(next(iter(self.entries)))
+
+
+class MultipartUpload:
+    """
+    Uploads bytes to one S3 object as a multipart upload while they are being produced
+    (e.g. by FFmpegWriter): every part_size bytes written become one part, uploaded by up
+    to concurrency threads while more data arrives. close() uploads the rest and completes
+    the object; abort() discards the parts. S3 requires parts of at least 5 MiB (the last
+    one excepted).
+    """
+
+    MIN_PART_SIZE = 5 * 1024 * 1024
+
+    def __init__(self, s3_client, bucket, key, part_size=8 * 1024 * 1024, concurrency=4, content_type='video/mp4'):
+        if part_size < self.MIN_PART_SIZE:
+            raise ValueError(f"part_size must be at least {self.MIN_PART_SIZE} bytes.")
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.buffer = bytearray()
+        self.futures = []
+        self.bytes = 0
+        self.error = None
+        self.finished = False
+        # Bounds the parts held in memory while their upload is pending.
+        self.slots = threading.Semaphore(concurrency)
+        self.pool = ThreadPoolExecutor(max_workers=concurrency)
+        self.upload_id = self.s3.create_multipart_upload(Bucket=bucket, Key=key, ContentType=content_type)['UploadId']
+
+    def write(self, data):
+        if self.error is not None:
+            raise self.error
+        self.buffer += data
+        self.bytes += len(data)
+        while len(self.buffer) >= self.part_size:
+            self._submit(bytes(self.buffer[:self.part_size]))
+            del self.buffer[:self.part_size]
+
+    def _submit(self, body):
+        self.slots.acquire()
+        future = self.pool.submit(self._upload_part, len(self.futures) + 1, body)
+        future.add_done_callback(self._part_done)
+        self.futures.append(future)
+
+    def _part_done(self, future):
+        self.slots.release()
+        if future.exception() is not None and self.error is None:
+            self.error = future.exception()
+
+    def _upload_part(self, number, body):
+        with stage('s3_upload_part', len(body)):
+            response = self.s3.upload_part(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                                           PartNumber=number, Body=body)
+        return {'PartNumber': number, 'ETag': response['ETag']}
+
+    def close(self):
+        """Uploads the remaining bytes, completes the object and returns its size in bytes."""
+        try:
+            if self.buffer or not self.futures:
+                self._submit(bytes(self.buffer))
+                self.buffer.clear()
+            parts = [future.result() for future in self.futures]
+            self.s3.complete_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                                              MultipartUpload={'Parts': parts})
+        except Exception:
+            self.abort()
+            raise
+        self.finished = True
+        self.pool.shutdown()
+        return self.bytes
+
+    def abort(self):
+        """Cancels the upload; S3 discards the parts already uploaded."""
+        if self.finished:
+            return
+        self.finished = True
+        self.pool.shutdown(cancel_futures=True)
+        try:
+            self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+        except Exception as e:
+            print(f"Could not abort the upload of s3://{self.bucket}/{self.key}: {e}")
+
+
 class S3Manager:
-    def __init__(self):
-        self.s3 = boto3.client('s3')
+    def __init__(self, max_workers=16, max_pool_connections=None, cache_bytes=512 * 1024 * 1024,
+                 cache_dir=None, disk_cache_bytes=2 * 1024 ** 3, atlas_dir=None,
+                 manifest_dir=None, listing_ttl=6 * 3600, s3_client=None,
+                 upload_part_size=8 * 1024 * 1024, upload_concurrency=8):
+        # boto3 clients are thread-safe; the connection pool must be at least as large as the
+        # thread pool or concurrent GETs queue up waiting for a connection.
+        self.max_workers = max_workers
+        pool_size = max_pool_connections or max(max_workers, 10)
+        # s3_client replaces the boto3 client, e.g. with the local stand-in of benchmarks/local_s3.py.
+        self.s3 = s3_client or boto3.client('s3', config=Config(max_pool_connections=pool_size))
+        self.listing = ListingManifest(self.s3, manifest_dir, listing_ttl)
+        self.image_cache = ImageCache(cache_bytes)
+        # Optional persistent object cache; ETags seen while listing let hits skip S3 entirely.
+        self.disk_cache = DiskCache(cache_dir, disk_cache_bytes) if cache_dir else None
+        self.etags = {}
+        # Counters bumped from the read_images worker threads.
+        self.counters_lock = threading.Lock()
+        self.gets = 0
+        # Optional pre-resized tiles (see modules/atlas.py), opened lazily per (bucket, prefix, geometry).
+        self.atlas_dir = atlas_dir
+        self.atlases = {}
+        # Held while an atlas is opened, so each one is loaded once; the image cache is not blocked.
+        self.atlases_lock = threading.Lock()
+        self.atlas_hits = 0
+        # Uploads of large files are split into parts of upload_part_size sent concurrently.
+        self.upload_part_size = upload_part_size
+        self.upload_concurrency = upload_concurrency
 
     @staticmethod
     def parse_s3_path(s3_path):
@@ -18,16 +291,151 @@ class S3Manager:
 
     def list_images(self, s3_path, allowed_exts=('.jpg', '.jpeg', '.png', '.bmp')):
         bucket, prefix = self.parse_s3_path(s3_path)
-        response = self.s3.list_objects_v2(Bucket=bucket, Prefix=prefix)
-        keys = [obj['Key'] for obj in response.get('Contents', []) if obj['Key'].lower().endswith(allowed_exts)]
+        keys = []
+        with stage('s3_list'):
+            objects = self.listing.list(bucket, prefix)
+        for obj in objects:
+            self.etags[(bucket, obj['key'])] = obj['etag']
+            if obj['key'].lower().endswith(allowed_exts):
+                keys.append(obj['key'])
         return sorted(keys, key=lambda k: natural_sort_key(k))
 
-    def read_image(self, bucket, key):
-        obj = self.s3.get_object(Bucket=bucket, Key=key)
-        data = np.asarray(bytearray(obj['Body'].read()), dtype=np.uint8)
-        return cv2.imdecode(data, cv2.IMREAD_COLOR)
+    def read_object(self, bucket, key):
+        """
+        Returns the raw bytes of an object, through the disk cache when one is configured.
+        A cached copy is served without any request when its ETag matches the one seen while
+        listing, and revalidated with a conditional GET otherwise.
+        """
+        cached_etag = None
+        if self.disk_cache:
+            etag = self.etags.get((bucket, key))
+            if etag:
+                data = self.disk_cache.get(bucket, key, etag)
+                if data is not None:
+                    return data
+            else:
+                cached_etag = self.disk_cache.latest_etag(bucket, key)
+
+        with self.counters_lock:
+            self.gets += 1
+        with stage('s3_get') as counters:
+            try:
+                if cached_etag:
+                    obj = self.s3.get_object(Bucket=bucket, Key=key, IfNoneMatch=f'"{cached_etag}"')
+                else:
+                    obj = self.s3.get_object(Bucket=bucket, Key=key)
+            except ClientError as e:
+                if cached_etag and e.response.get('ResponseMetadata', {}).get('HTTPStatusCode') == 304:
+                    data = self.disk_cache.get(bucket, key, cached_etag)
+                    if data is not None:
+                        return data
+                    obj = self.s3.get_object(Bucket=bucket, Key=key)
+                else:
+                    raise
+            data = obj['Body'].read()
+            counters['bytes'] = len(data)
+        if self.disk_cache:
+            self.disk_cache.put(bucket, key, obj.get('ETag'), data)
+        return data
+
+    def download_image(self, bucket, key):
+        """Downloads (or reads from the disk cache) and decodes one object, bypassing the image cache."""
+        data = np.frombuffer(self.read_object(bucket, key), dtype=np.uint8)
+        with stage('decode', data.nbytes):
+            return cv2.imdecode(data, cv2.IMREAD_COLOR)
+
+    def read_image(self, bucket, key, geometry=None):
+        """
+        Returns the decoded image, resized to geometry (see utils.resize_to_geometry),
+        from the run cache when possible. The returned array is read-only.
+        """
+        return self._read_geometries(bucket, key, [geometry])[0]
+
+    def _atlas_tile(self, bucket, key, geometry):
+        """Returns the pre-resized tile of key from its folder's atlas, or None."""
+        prefix = key.rsplit('/', 1)[0] + '/' if '/' in key else ''
+        atlas_key = (bucket, prefix, geometry)
+        with self.atlases_lock:
+            if atlas_key not in self.atlases:
+                self.atlases[atlas_key] = load_atlas(self.atlas_dir, bucket, prefix, geometry)
+            atlas = self.atlases[atlas_key]
+        if atlas is None:
+            return None
+        tile = atlas.get(key, self.etags.get((bucket, key)))
+        if tile is not None:
+            with self.counters_lock:
+                self.atlas_hits += 1
+        return tile
+
+    def _read_geometries(self, bucket, key, geometries):
+        """
+        Serves every geometry of one key from the cache or the atlas, downloading and
+        decoding at most once.
+        """
+        results = [self.image_cache.get((bucket, key, g)) for g in geometries]
+        if self.atlas_dir:
+            for i, geometry in enumerate(geometries):
+                if results[i] is None and geometry is not None:
+                    results[i] = self._atlas_tile(bucket, key, geometry)
+        if all(r is not None for r in results):
+            return results
+        original = self.image_cache.get((bucket, key, None), record=False)
+        if original is None:
+            original = self.download_image(bucket, key)
+            if original is None:
+                return results
+            if None in geometries:
+                self.image_cache.put((bucket, key, None), original)
+        for i, geometry in enumerate(geometries):
+            if results[i] is None:
+                with stage('resize', original.nbytes):
+                    results[i] = resize_to_geometry(original, geometry)
+                self.image_cache.put((bucket, key, geometry), results[i])
+        return results
+
+    def read_images(self, bucket, keys, max_workers=None):
+        """
+        Fetches and decodes many objects concurrently.
+        Each item of keys is a key or a (key, geometry) tuple; every key is downloaded and
+        decoded at most once, whatever the number of geometries or repeats requested.
+        Returns (images, errors): images is aligned with keys (None where an item failed) and
+        errors maps each failed key to its exception.
+        """
+        requests = [item if isinstance(item, tuple) else (item, None) for item in keys]
+        by_key = OrderedDict()
+        for key, geometry in requests:
+            geometries = by_key.setdefault(key, [])
+            if geometry not in geometries:
+                geometries.append(geometry)
+        errors = {}
+
+        def fetch(key):
+            try:
+                images = self._read_geometries(bucket, key, by_key[key])
+                if any(image is None for image in images):
+                    raise ValueError("could not decode image")
+                return dict(zip(by_key[key], images))
+            except Exception as e:
+                errors[key] = e
+                return {}
+
+        workers = max(1, min(max_workers or self.max_workers, len(by_key)))
+        with stage('load_images'), ThreadPoolExecutor(max_workers=workers) as pool:
+            fetched = dict(zip(by_key, pool.map(fetch, by_key)))
+        return [fetched[key].get(geometry) for key, geometry in requests], errors
+
+    @staticmethod
+    def object_url(bucket, key):
+        return f"https://{bucket}.s3.amazonaws.com/{key}"
 
     def upload_file(self, local_path, bucket, key):
-        self.s3.upload_file(local_path, bucket, key)
-        video_url = f"https://{bucket}.s3.amazonaws.com/{key}"
-        return video_url
\ No newline at end of file
+        """Uploads a local file (as a concurrent multipart upload above one part) and returns its URL."""
+        config = TransferConfig(multipart_threshold=self.upload_part_size, multipart_chunksize=self.upload_part_size,
+                                max_concurrency=self.upload_concurrency)
+        with stage('s3_upload', os.path.getsize(local_path)):
+            self.s3.upload_file(local_path, bucket, key, Config=config)
+        return self.object_url(bucket, key)
+
+    def open_upload(self, bucket, key):
+        """Starts a MultipartUpload to bucket/key with this manager's part size and concurrency."""
+        return MultipartUpload(self.s3, bucket, key, self.upload_part_size, self.upload_concurrency)
@@ -1,8 +1,11 @@
 import os
 import re
+import math
+import bisect
 import cv2
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
+from .encoder import FFmpegWriter, quality_to_crf
 
 ##############################
 # --- Common Helper Functions ---
@@ -54,30 +57,97 @@ def wrap_text(text, font, max_width):
             lines.append(' '.join(current_line))
     return lines
 
+def draw_text_config(draw, config, bg_fill, text_fill):
+    """Draws one processed text config (background box, then wrapped lines) with the given fills."""
+    if config['bg_color'] and bg_fill is not None:
+        draw.rounded_rectangle(
+            config['bg_coords'],
+            radius=config['corner_radius'],
+            fill=bg_fill
+        )
+    if text_fill is None:
+        return
+    x_pos, y_pos = config['position']
+    box_width = config['box_width']
+    for idx, line in enumerate(config['wrapped_lines']):
+        line_width = config['font'].getlength(line)
+        line_x = x_pos + (box_width - line_width) // 2
+        current_y = y_pos + idx * config['line_height'] - config['ascent']
+        draw.text((line_x, current_y), line, font=config['font'], fill=text_fill)
+
+def rasterize_text_config(config, canvas_width):
+    """
+    Renders one processed text config once into a cropped BGR patch plus alpha.
+    Pixels under the background box are opaque; glyph pixels outside it keep their
+    coverage, so blending with PIL's rounding reproduces a per-frame draw exactly.
+    Returns None when the config draws nothing.
+    """
+    font = config['font']
+    bottom = config['bg_coords'][3] + 1
+    x_pos, y_pos = config['position']
+    for idx, line in enumerate(config['wrapped_lines']):
+        current_y = y_pos + idx * config['line_height'] - config['ascent']
+        bottom = max(bottom, current_y + font.getbbox(line)[3] + 2)
+    size = (canvas_width, max(int(math.ceil(bottom)), 1))
+
+    color_img = Image.new('RGB', size, (0, 0, 0))
+    draw_text_config(ImageDraw.Draw(color_img), config, config['bg_color'], config['color'])
+    box_img = Image.new('L', size, 0)
+    draw_text_config(ImageDraw.Draw(box_img), config, 255, None)
+    text_img = Image.new('L', size, 0)
+    draw_text_config(ImageDraw.Draw(text_img), config, None, 255)
+
+    box = np.asarray(box_img) > 0
+    alpha = np.where(box, 255, np.asarray(text_img)).astype(np.uint16)
+    bgr = np.where(box[..., None], np.asarray(color_img), np.array(config['color'][:3], dtype=np.uint8))[..., ::-1]
+
+    ys, xs = np.nonzero(alpha)
+    if not len(ys):
+        return None
+    y0, y1, x0, x1 = ys.min(), ys.max() + 1, xs.min(), xs.max() + 1
+    alpha = alpha[y0:y1, x0:x1, None]
+    return {
+        'y': int(y0),
+        'x': int(x0),
+        # out = DIV255(frame * (255 - alpha) + color * alpha), the same rounding PIL uses
+        'inv_alpha': np.ascontiguousarray(255 - alpha),
+        'premultiplied': np.ascontiguousarray(bgr[y0:y1, x0:x1] * alpha + 128),
+        # Reused by every blend so the per-frame overlay allocates nothing
+        'blended': np.empty((y1 - y0, x1 - x0, 3), dtype=np.uint16),
+        'carry': np.empty((y1 - y0, x1 - x0, 3), dtype=np.uint16),
+    }
+
 def add_text_overlays(frame, processed_text_configs):
-    """Adds text overlays (with optional background rectangles) onto the frame."""
-    img_pil = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-    draw = ImageDraw.Draw(img_pil)
+    """
+    Blends the pre-rasterized text overlays into the frame in place and returns it.
+    Only the cropped overlay regions are touched, through the overlay's own scratch buffers
+    (so one set of configs must not be blended from several threads at once).
+    """
+    frame_height = frame.shape[0]
     for config in processed_text_configs:
-        if config['bg_color']:
-            draw.rounded_rectangle(
-                config['bg_coords'],
-                radius=config['corner_radius'],
-                fill=config['bg_color']
-            )
-        x_pos, y_pos = config['position']
-        box_width = config['box_width']
-        for idx, line in enumerate(config['wrapped_lines']):
-            line_width = config['font'].getlength(line)
-            line_x = x_pos + (box_width - line_width) // 2
-            current_y = y_pos + idx * config['line_height'] - config['ascent']
-            draw.text((line_x, current_y), line, font=config['font'], fill=config['color'])
-    return cv2.cvtColor(np.array(img_pil), cv2.COLOR_RGB2BGR)
+        overlay = config.get('overlay')
+        if overlay is None:
+            continue
+        y, x = overlay['y'], overlay['x']
+        inv_alpha = overlay['inv_alpha']
+        rows = min(inv_alpha.shape[0], frame_height - y)
+        if rows <= 0:
+            continue
+        region = frame[y:y + rows, x:x + inv_alpha.shape[1]]
+        blended, carry = overlay['blended'][:rows], overlay['carry'][:rows]
+        np.multiply(region, inv_alpha[:rows], out=blended)
+        blended += overlay['premultiplied'][:rows]
+        np.right_shift(blended, 8, out=carry)
+        blended += carry
+        blended >>= 8
+        region[...] = blended
+    return frame
 
 def prepare_text_configs(text_configs, canvas_width):
     """
     Processes text configuration dictionaries:
       - Loads fonts, converts hex colors, and wraps text.
+      - Pre-rasterizes each overlay once (see rasterize_text_config).
       - Returns a list of processed configuration dictionaries.
     """
     processed = []
@@ -128,7 +198,7 @@ def prepare_text_configs(text_configs, canvas_width):
         bg_right = x + box_width + padding
         bg_bottom = y + total_text_height - descent + padding - 40
         
-        processed.append({
+        processed_config = {
             'wrapped_lines': wrapped_lines,
             'font': font,
             'color': color,
@@ -139,7 +209,9 @@ def prepare_text_configs(text_configs, canvas_width):
             'line_height': line_height,
             'ascent': ascent,
             'box_width': box_width
-        })
+        }
+        processed_config['overlay'] = rasterize_text_config(processed_config, canvas_width)
+        processed.append(processed_config)
     return processed
 
 def resize_to_width(image, target_width):
@@ -153,49 +225,76 @@ def resize_to_square(image, size):
     """Resizes an image to a square of given size."""
     return cv2.resize(image, (size, size), interpolation=cv2.INTER_AREA)
 
-'''def build_composite_strip_vertical(image_list, required_height):
+def resize_to_geometry(image, geometry):
     """
-    Builds a tall composite image by stacking images vertically until the total height >= required_height.
-    (Used for mode a.)
+    Resizes an image to a geometry tuple: ('width', w), ('height', h) or ('square', size).
+    A geometry of None returns the image unchanged.
     """
-    if not image_list:
-        return None
-    composite = image_list[0]
-    idx = 1
-    while composite.shape[0] < required_height:
-        next_img = image_list[idx % len(image_list)]
-        composite = np.vstack((composite, next_img))
-        idx += 1
-    return composite'''
-
-def build_composite_column(image_list, required_height):
+    if geometry is None:
+        return image
+    kind, size = geometry
+    if kind == 'width':
+        return resize_to_width(image, size)
+    if kind == 'height':
+        return resize_to_height(image, size)
+    if kind == 'square':
+        return resize_to_square(image, size)
+    raise ValueError(f"Unknown geometry '{kind}'.")
+
+class VirtualStrip:
     """
-    Builds a composite column by stacking images vertically until the total height >= required_height.
-    (Used for modes b, c, and d.)
+    A scrolling strip made of tiles laid end to end along one axis ('y' stacks them
+    vertically, 'x' horizontally) without ever concatenating them.
+    Tiles cycle through image_list until the strip is at least required_length long,
+    and windows are copied straight from the tiles into a destination buffer.
     """
-    if not image_list:
-        return None
-    composite = image_list[0]
-    idx = 1
-    while composite.shape[0] < required_height:
-        next_img = image_list[idx % len(image_list)]
-        composite = np.vstack((composite, next_img))
-        idx += 1
-    return composite
-
-def build_composite_strip(image_list, required_width):
-    if not image_list:
-        return None
-    composite = image_list[0]
-    idx = 1
-    while composite.shape[1] < required_width:
-        next_img = image_list[idx % len(image_list)]
-        composite = np.hstack((composite, next_img))
-        idx += 1
-    return composite
-
-def generate_video_writer(output_file, width, height, quality, fps):
-    """Creates and returns a cv2.VideoWriter for the final video."""
+
+    def __init__(self, image_list, required_length, axis):
+        self.axis = axis
+        along = 0 if axis == 'y' else 1
+        self.tiles = []
+        starts = [0]
+        idx = 0
+        while not self.tiles or starts[-1] < required_length:
+            tile = image_list[idx % len(image_list)]
+            self.tiles.append(tile)
+            starts.append(starts[-1] + tile.shape[along])
+            idx += 1
+        # starts[i] is where tile i begins; starts[-1] is the total length.
+        self.starts = starts
+        self.length = starts[-1]
+
+    def copy_window(self, offset, out, cross_offset=0):
+        """
+        Copies the strip section starting at offset into out. The window is as long as out
+        along the strip axis; across it, out is filled from cross_offset onwards.
+        """
+        extent = out.shape[0] if self.axis == 'y' else out.shape[1]
+        cross = out.shape[1] if self.axis == 'y' else out.shape[0]
+        i = bisect.bisect_right(self.starts, offset) - 1
+        pos = 0
+        while pos < extent:
+            tile = self.tiles[i]
+            start = offset + pos - self.starts[i]
+            n = min(self.starts[i + 1] - self.starts[i] - start, extent - pos)
+            if self.axis == 'y':
+                out[pos:pos + n] = tile[start:start + n, cross_offset:cross_offset + cross]
+            else:
+                out[:, pos:pos + n] = tile[cross_offset:cross_offset + cross, start:start + n]
+            pos += n
+            i += 1
+
+def generate_video_writer(output_file, width, height, quality, fps, encoder='cv2', audio_file=None, stream=None):
+    """
+    Creates and returns the video writer for the final video.
+      - 'cv2': an mp4v cv2.VideoWriter (audio has to be attached afterwards).
+      - 'ffmpeg': an FFmpegWriter producing the final H.264 + AAC file in one pass at the
+        CRF matching quality (see encoder.quality_to_crf), also handing its bytes to stream
+        while encoding when one is given.
+    """
+    if encoder == 'ffmpeg':
+        return FFmpegWriter(output_file, width, height, fps, audio_file=audio_file, crf=quality_to_crf(quality),
+                            stream=stream)
     fourcc = cv2.VideoWriter_fourcc(*'mp4v')
     writer = cv2.VideoWriter(output_file, fourcc, fps, (width, height))
     writer.set(cv2.VIDEOWRITER_PROP_QUALITY, quality * 100)
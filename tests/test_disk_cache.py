@@ -0,0 +1,57 @@
+import os
+from modules.s3 import DiskCache
+
+
+def _size_on_disk(root):
+    return sum(entry.stat().st_size for entry in os.scandir(root))
+
+
+def test_overwriting_an_entry_keeps_the_byte_count(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1000)
+    cache.put('b', 'k', '"e1"', b'x' * 100)
+    cache.put('b', 'k', '"e1"', b'x' * 100)
+    assert cache.bytes == 100 == _size_on_disk(tmp_path)
+    assert cache.get('b', 'k', '"e1"') == b'x' * 100
+
+
+def test_a_new_etag_replaces_the_old_version(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1000)
+    cache.put('b', 'k', '"e1"', b'x' * 100)
+    cache.put('b', 'k', '"e2"', b'y' * 40)
+    assert cache.get('b', 'k', '"e1"') is None
+    assert cache.get('b', 'k', '"e2"') == b'y' * 40
+    assert cache.latest_etag('b', 'k') == 'e2'
+    assert cache.bytes == 40 == _size_on_disk(tmp_path)
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=250)
+    cache.put('b', 'k1', '"e"', b'1' * 100)
+    cache.put('b', 'k2', '"e"', b'2' * 100)
+    cache.get('b', 'k1', '"e"')
+    cache.put('b', 'k3', '"e"', b'3' * 100)
+    assert cache.get('b', 'k2', '"e"') is None
+    assert cache.get('b', 'k1', '"e"') == b'1' * 100
+    assert cache.get('b', 'k3', '"e"') == b'3' * 100
+    assert cache.bytes == 200 == _size_on_disk(tmp_path)
+
+
+def test_index_is_rebuilt_from_the_directory(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1000)
+    cache.put('b', 'k1', '"e1"', b'1' * 100)
+    cache.put('b', 'k2', '"e2"', b'2' * 50)
+    reopened = DiskCache(str(tmp_path), max_bytes=1000)
+    assert reopened.bytes == 150
+    assert reopened.latest_etag('b', 'k1') == 'e1'
+    assert reopened.get('b', 'k2', '"e2"') == b'2' * 50
+    assert reopened.latest_etag('b', 'missing') is None
+
+
+def test_a_file_removed_behind_the_cache_is_forgotten(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1000)
+    cache.put('b', 'k', '"e"', b'x' * 100)
+    for name in os.listdir(tmp_path):
+        os.remove(tmp_path / name)
+    assert cache.get('b', 'k', '"e"') is None
+    assert cache.bytes == 0 and cache.latest_etag('b', 'k') is None
@@ -0,0 +1,93 @@
+import pytest
+from modules import polling
+from modules.facebook_story import FacebookStory
+
+UPLOADING = {'video_status': 'processing', 'uploading_phase': {'status': 'in_progress'},
+             'processing_phase': {'status': 'not_started'}, 'publishing_phase': {'status': 'not_started'}}
+UPLOADED = {'video_status': 'upload_complete', 'uploading_phase': {'status': 'complete'},
+            'processing_phase': {'status': 'not_started'}, 'publishing_phase': {'status': 'not_started'}}
+PROCESSING = {'video_status': 'processing', 'uploading_phase': {'status': 'complete'},
+              'processing_phase': {'status': 'in_progress'}, 'publishing_phase': {'status': 'not_started'}}
+READY = {'video_status': 'ready', 'uploading_phase': {'status': 'complete'},
+         'processing_phase': {'status': 'complete'}, 'publishing_phase': {'status': 'complete'}}
+FAILED = {'video_status': 'error', 'uploading_phase': {'status': 'complete'},
+          'processing_phase': {'status': 'error'}, 'publishing_phase': {'status': 'not_started'}}
+
+
+class FakeGraph:
+    """Answers the reel flow's Graph calls and logs them; statuses are served in order (the last repeats)."""
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.log = []
+
+    def post(self, url, data=None, json=None, params=None, headers=None):
+        if 'rupload' in url:
+            self.log.append('upload')
+            return {'success': True}
+        phase = (json or params or data)['upload_phase']
+        self.log.append(phase)
+        return {'video_id': 'v1'} if phase == 'start' else {'success': True, 'post_id': 'p1'}
+
+    def get(self, url, params=None):
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        self.log.append(status['video_status'])
+        return {'status': status}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(polling.time, 'monotonic', lambda: now[0])
+    monkeypatch.setattr(polling.time, 'sleep', lambda seconds: now.__setitem__(0, now[0] + seconds))
+    return now
+
+
+def _reel(monkeypatch, statuses):
+    monkeypatch.setenv('PAGE_ID', 'page')
+    monkeypatch.setenv('PAGE_ACCESS_TOKEN', 'token')
+    reel = FacebookStory(poll_deadline=100, upload_deadline=30)
+    reel.client = FakeGraph(statuses)
+    return reel
+
+
+def test_finish_is_sent_once_the_upload_completes(monkeypatch, clock):
+    reel = _reel(monkeypatch, [UPLOADING, UPLOADED, PROCESSING, PROCESSING, READY])
+    assert reel.share_reel("https://bucket/video.mp4", "description") == 'p1'
+    # Processing is only polled after the finish call that starts it.
+    assert reel.client.log == ['start', 'upload', 'processing', 'upload_complete', 'finish',
+                               'processing', 'processing', 'ready']
+    assert clock[0] < 15
+
+
+def test_processing_failure_after_finish(monkeypatch, clock):
+    reel = _reel(monkeypatch, [UPLOADED, PROCESSING, FAILED])
+    assert reel.share_reel("https://bucket/video.mp4") is None
+    assert reel.client.log[-3:] == ['finish', 'processing', 'error']
+
+
+def test_upload_that_never_completes_is_not_finished(monkeypatch, clock):
+    reel = _reel(monkeypatch, [UPLOADING])
+    assert reel.share_reel("https://bucket/video.mp4") is None
+    assert 'finish' not in reel.client.log
+    assert clock[0] == 30
+
+
+def test_slow_processing_still_returns_the_post(monkeypatch, clock):
+    reel = _reel(monkeypatch, [UPLOADED, PROCESSING])
+    assert reel.share_reel("https://bucket/video.mp4") == 'p1'
+    assert clock[0] == 100
+
+
+@pytest.mark.parametrize('status, upload, final', [
+    (UPLOADING, 'pending', 'pending'),
+    (UPLOADED, 'finished', 'pending'),
+    (PROCESSING, 'finished', 'pending'),
+    (dict(READY, publishing_phase={'status': 'in_progress'}), 'finished', 'pending'),
+    (READY, 'finished', 'finished'),
+    (FAILED, 'error', 'error'),
+    ({'video_status': 'expired'}, 'expired', 'expired'),
+])
+def test_status_classification(status, upload, final):
+    assert FacebookStory.classify_upload(status).value == upload
+    assert FacebookStory.classify_status(status).value == final
@@ -0,0 +1,89 @@
+import json
+from urllib.parse import parse_qs
+from modules.graph import GraphClient, GraphAPIError
+
+
+def _client(responses):
+    """A GraphClient whose batch POST returns responses and records what it was sent."""
+    client = GraphClient()
+    client.sent = []
+
+    def post(path, data=None, **kwargs):
+        client.sent.append((path, data))
+        return responses
+    client.post = post
+    return client
+
+
+def _response(body, code=200):
+    return {'code': code, 'body': json.dumps(body)}
+
+
+def test_result_references_are_not_encoded():
+    body = GraphClient._encode_body({
+        'message': 'a&b c',
+        'attached_media[0]': '{"media_fbid":"1"}',
+        'object_id': '{result=photo:$.id}',
+    })
+    assert body == ('message=a%26b+c&attached_media%5B0%5D=%7B%22media_fbid%22%3A%221%22%7D'
+                    '&object_id={result=photo:$.id}')
+
+
+def test_a_reference_inside_other_text_is_encoded():
+    # Only a value that is exactly one reference is passed through.
+    assert GraphClient._encode_body({'q': 'x {result=a:$.id}'}) == 'q=x+%7Bresult%3Da%3A%24.id%7D'
+
+
+def test_batch_request_items():
+    client = _client([_response({'id': '1'}), _response({'post_id': '2'})])
+    client.batch([
+        {'method': 'POST', 'relative_url': 'me/photos', 'name': 'photo', 'body': {'published': 'false'}},
+        {'method': 'POST', 'relative_url': '{result=photo:$.id}/comments', 'body': {'message': 'hi there'}},
+    ], access_token='token')
+
+    path, data = client.sent[0]
+    assert path == ""
+    assert data['access_token'] == 'token' and data['include_headers'] == 'false'
+    items = json.loads(data['batch'])
+    assert items[0] == {'method': 'POST', 'relative_url': 'me/photos', 'name': 'photo',
+                        'omit_response_on_success': False, 'body': 'published=false'}
+    # The reference in the URL is sent as is; Graph resolves it server side.
+    assert items[1] == {'method': 'POST', 'relative_url': '{result=photo:$.id}/comments',
+                        'body': 'message=hi+there'}
+    assert parse_qs(items[1]['body']) == {'message': ['hi there']}
+
+
+def test_named_call_can_still_omit_its_response():
+    client = _client([_response({'id': '1'})])
+    client.batch([{'method': 'GET', 'relative_url': 'me', 'name': 'me', 'omit_response_on_success': True}], 't')
+    assert json.loads(client.sent[0][1]['batch'])[0]['omit_response_on_success'] is True
+
+
+def test_batch_results_per_call():
+    client = _client([
+        _response({'id': '1'}),
+        _response({'error': {'message': 'Invalid parameter', 'code': 100, 'type': 'OAuthException'}}, code=400),
+        None,
+        {'code': 500, 'body': 'not json'},
+    ])
+    results = client.batch([
+        {'method': 'POST', 'relative_url': 'me/photos', 'name': 'photo'},
+        {'method': 'POST', 'relative_url': 'me/feed', 'name': 'feed'},
+        {'method': 'POST', 'relative_url': '{result=feed:$.id}/comments'},
+        {'method': 'GET', 'relative_url': 'me'},
+    ], 't')
+
+    assert results[0] == {'id': '1'}
+    assert isinstance(results[1], GraphAPIError)
+    assert (results[1].message, results[1].status, results[1].code, results[1].error_type) == \
+        ('Invalid parameter', 400, 100, 'OAuthException')
+    # A call skipped because the call it references failed comes back as null.
+    assert isinstance(results[2], GraphAPIError)
+    assert results[2].message == "batch call {result=feed:$.id}/comments was not executed"
+    assert isinstance(results[3], GraphAPIError) and results[3].status == 500
+
+
+def test_error_in_a_200_body_is_a_failure():
+    client = _client([_response({'error': {'message': 'Media not ready', 'code': 9007}})])
+    result = client.batch([{'method': 'POST', 'relative_url': 'x/media_publish'}], 't')[0]
+    assert isinstance(result, GraphAPIError) and result.code == 9007
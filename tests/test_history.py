@@ -0,0 +1,123 @@
+import os
+from modules.history import PostedHistory
+
+
+def _lines(path):
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+def test_add_is_persisted_and_idempotent(tmp_path):
+    path = str(tmp_path / "history.log")
+    history = PostedHistory(path)
+    history.add("a")
+    history.add("b")
+    history.add("a")
+    assert "a" in history and "b" in history and len(history) == 2
+    assert _lines(path) == ["a", "b"]
+    assert list(PostedHistory(path).urls) == ["a", "b"]
+
+
+def test_discard_writes_a_tombstone(tmp_path):
+    path = str(tmp_path / "history.log")
+    history = PostedHistory(path)
+    history.add("a")
+    history.add("b")
+    history.discard("a")
+    history.discard("missing")
+    assert "a" not in history and len(history) == 1
+    assert _lines(path) == ["a", "b", "- a"]
+
+    reopened = PostedHistory(path)
+    assert list(reopened.urls) == ["b"]
+    # A withdrawn URL can be posted again.
+    reopened.add("a")
+    assert list(PostedHistory(path).urls) == ["b", "a"]
+
+
+def test_tombstones_trigger_compaction(tmp_path):
+    path = str(tmp_path / "history.log")
+    history = PostedHistory(path, compact_ratio=0.5)
+    for i in range(10):
+        history.add(f"url{i}")
+    for i in range(6):
+        history.discard(f"url{i}")
+    assert len(_lines(path)) == 16
+    # The 17th line leaves 3 live URLs out of 17: rewritten without the withdrawn entries.
+    history.discard("url6")
+    assert _lines(path) == ["url7", "url8", "url9"]
+    assert list(history.urls) == ["url7", "url8", "url9"]
+    assert history.lines == 3
+    # Appends continue on the compacted log.
+    history.discard("url7")
+    assert _lines(path) == ["url7", "url8", "url9", "- url7"]
+    assert list(PostedHistory(path).urls) == ["url8", "url9"]
+
+
+def test_no_compaction_below_the_ratio(tmp_path):
+    path = str(tmp_path / "history.log")
+    history = PostedHistory(path, compact_ratio=0.5)
+    for i in range(20):
+        history.add(f"url{i}")
+    history.discard("url0")
+    assert len(_lines(path)) == 21
+
+
+def test_explicit_compact(tmp_path):
+    path = str(tmp_path / "history.log")
+    history = PostedHistory(path)
+    history.add("a")
+    history.add("b")
+    history.discard("a")
+    history.compact()
+    assert _lines(path) == ["b"]
+    assert list(history.urls) == ["b"]
+
+
+def test_concurrent_writers_see_each_other(tmp_path):
+    path = str(tmp_path / "history.log")
+    first = PostedHistory(path)
+    second = PostedHistory(path)
+    first.add("a")
+    second.add("b")
+    # second read "a" before appending, so adding it again is a no-op.
+    second.add("a")
+    first.add("c")
+    assert _lines(path) == ["a", "b", "c"]
+    assert list(first.urls) == ["a", "b", "c"]
+
+
+def test_compaction_by_another_writer_is_picked_up(tmp_path):
+    path = str(tmp_path / "history.log")
+    first = PostedHistory(path)
+    second = PostedHistory(path)
+    first.add("a")
+    first.add("b")
+    first.discard("a")
+    second.compact()
+    # first's read offset points past the end of the rewritten file; it starts over.
+    first.add("c")
+    assert _lines(path) == ["b", "c"]
+    assert list(first.urls) == ["b", "c"]
+
+
+def test_torn_last_line_is_read_once_complete(tmp_path):
+    path = str(tmp_path / "history.log")
+    history = PostedHistory(path)
+    history.add("a")
+    with open(path, "a") as f:
+        f.write("partial-ur")
+    reader = PostedHistory(path)
+    assert list(reader.urls) == ["a"]
+    with open(path, "a") as f:
+        f.write("l\n")
+    reader.add("b")
+    assert list(reader.urls) == ["a", "partial-url", "b"]
+
+
+def test_missing_file_is_created_on_first_add(tmp_path):
+    path = str(tmp_path / "history.log")
+    history = PostedHistory(path)
+    assert len(history) == 0 and not os.path.exists(path)
+    history.add("a")
+    assert _lines(path) == ["a"]
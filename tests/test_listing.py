@@ -0,0 +1,104 @@
+import os
+import json
+from modules.listing import ListingManifest
+
+
+class FakeS3:
+    """In-memory list_objects_v2 with S3's paging (StartAfter/ContinuationToken, page_size keys a page)."""
+
+    def __init__(self, keys, page_size=1000):
+        self.keys = set(keys)
+        self.page_size = page_size
+        self.calls = []
+
+    def list_objects_v2(self, Bucket, Prefix='', StartAfter=None, ContinuationToken=None):
+        self.calls.append({'StartAfter': StartAfter, 'ContinuationToken': ContinuationToken})
+        after = ContinuationToken or StartAfter
+        keys = sorted(k for k in self.keys if k.startswith(Prefix) and (after is None or k > after))
+        page = keys[:self.page_size]
+        response = {'Contents': [{'Key': k, 'Size': len(k), 'ETag': f'"{k}"'} for k in page],
+                    'IsTruncated': len(keys) > self.page_size}
+        if response['IsTruncated']:
+            response['NextContinuationToken'] = page[-1]
+        return response
+
+    def get_paginator(self, operation):
+        client = self
+
+        class Paginator:
+            def paginate(self, **kwargs):
+                while True:
+                    page = client.list_objects_v2(**kwargs)
+                    yield page
+                    if not page['IsTruncated']:
+                        return
+                    kwargs['ContinuationToken'] = page['NextContinuationToken']
+        return Paginator()
+
+
+def _keys(n, prefix='pics/'):
+    return [f"{prefix}{i:05d}.jpg" for i in range(n)]
+
+
+def test_paginates_past_one_page():
+    client = FakeS3(_keys(2500) + ['other/1.jpg'])
+    objects = ListingManifest(client).list('bucket', 'pics/')
+    assert [o['key'] for o in objects] == _keys(2500)
+    assert len(client.calls) == 3
+    assert objects[0] == {'key': 'pics/00000.jpg', 'size': 14, 'etag': '"pics/00000.jpg"', 'last_modified': None}
+
+
+def test_listing_is_kept_in_memory():
+    client = FakeS3(_keys(10))
+    listing = ListingManifest(client)
+    listing.list('bucket', 'pics/')
+    listing.list('bucket', 'pics/')
+    assert len(client.calls) == 1
+    listing.list('bucket', 'pics/', refresh=True)
+    assert len(client.calls) == 2
+
+
+def test_fresh_manifest_is_reused_across_runs(tmp_path):
+    client = FakeS3(_keys(10))
+    ListingManifest(client, str(tmp_path)).list('bucket', 'pics/')
+    client.keys.add('pics/99999.jpg')
+    objects = ListingManifest(client, str(tmp_path), ttl=3600).list('bucket', 'pics/')
+    assert len(client.calls) == 1
+    assert len(objects) == 10
+
+
+def test_expired_manifest_is_refreshed_in_shards(tmp_path):
+    keys = _keys(350)
+    client = FakeS3(keys, page_size=40)
+    ListingManifest(client, str(tmp_path), shard_size=100).list('bucket', 'pics/')
+
+    # Changes in the first, a middle and the open-ended last shard, and on a shard boundary.
+    client.keys -= {'pics/00000.jpg', 'pics/00099.jpg', 'pics/00150.jpg'}
+    client.keys |= {'pics/00150a.jpg', 'pics/00199a.jpg', 'pics/99999.jpg'}
+    client.calls.clear()
+    objects = ListingManifest(client, str(tmp_path), ttl=0, shard_size=100).list('bucket', 'pics/')
+
+    assert [o['key'] for o in objects] == sorted(client.keys)
+    # One range per shard boundary of the previous manifest (99, 199, 299) plus the tail.
+    starts = {call['StartAfter'] for call in client.calls if call['ContinuationToken'] is None}
+    assert starts == {None, 'pics/00099.jpg', 'pics/00199.jpg', 'pics/00299.jpg'}
+
+
+def test_manifest_file_round_trip(tmp_path):
+    client = FakeS3(_keys(3))
+    ListingManifest(client, str(tmp_path)).list('bucket', 'pics/')
+    files = os.listdir(tmp_path)
+    assert files == ['bucket_pics.json']
+    with open(tmp_path / files[0]) as f:
+        manifest = json.load(f)
+    assert manifest['bucket'] == 'bucket' and manifest['prefix'] == 'pics/'
+    assert [o['key'] for o in manifest['objects']] == _keys(3)
+
+
+def test_manifest_of_another_prefix_is_ignored(tmp_path):
+    client = FakeS3(_keys(3) + _keys(2, 'pics_/'))
+    listing = ListingManifest(client, str(tmp_path))
+    listing.list('bucket', 'pics/')
+    # 'pics_/' maps to the same file name as 'pics/'; the stored prefix tells them apart.
+    objects = ListingManifest(client, str(tmp_path)).list('bucket', 'pics_/')
+    assert [o['key'] for o in objects] == _keys(2, 'pics_/')
@@ -0,0 +1,83 @@
+import os
+import cv2
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+from modules.utils import prepare_text_configs, add_text_overlays, draw_text_config
+
+FONT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         "auto_post_reels", "reel_fonts", "SuperCaramel-5yBza.ttf")
+WIDTH, HEIGHT = 720, 1280
+
+
+def _config(**overrides):
+    config = {
+        'content': "Happy Coloring! Link in Bio!",
+        'font_path': FONT_PATH,
+        'font_size': 60,
+        'color_hex': "#fffbed",
+        'bg_color_hex': "#5a006b",
+        'y': 170,
+        'box_width': 520,
+        'padding': 5,
+        'corner_radius': 25,
+    }
+    config.update(overrides)
+    return config
+
+
+def _draw_per_frame(frame, configs):
+    """Reference: the per-frame PIL draw the pre-rasterized overlays replace."""
+    image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    draw = ImageDraw.Draw(image)
+    for config in configs:
+        draw_text_config(draw, config, config['bg_color'], config['color'])
+    return cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+
+
+def _frames(height=HEIGHT):
+    rng = np.random.default_rng(0)
+    yield rng.integers(0, 256, (height, WIDTH, 3), dtype=np.uint8)
+    yield np.zeros((height, WIDTH, 3), dtype=np.uint8)
+    yield np.full((height, WIDTH, 3), 255, dtype=np.uint8)
+
+
+@pytest.mark.parametrize('configs', [
+    [_config()],
+    # No background box: glyph edges are blended with their anti-aliasing coverage.
+    [_config(bg_color_hex=None)],
+    # A colour with an alpha byte (ignored on an RGB frame, as PIL does) and overlapping overlays.
+    [_config(color_hex="#ff000080", bg_color_hex=None), _config(y=190, content="Overlap", bg_color_hex="#00ff00")],
+    [_config(), _config(content="Check Our Website. lily10coloringbooks.fun", font_size=55, y=1150,
+                        box_width=680)],
+], ids=['box', 'no-box', 'rgba-overlap', 'two-lines'])
+def test_blend_matches_per_frame_draw(configs):
+    processed = prepare_text_configs(configs, WIDTH)
+    assert len(processed) == len(configs)
+    for frame in _frames():
+        expected = _draw_per_frame(frame, processed)
+        assert np.array_equal(add_text_overlays(frame.copy(), processed), expected)
+
+
+def test_overlay_clipped_at_the_bottom_of_the_frame():
+    processed = prepare_text_configs([_config(y=1150)], WIDTH)
+    overlay = processed[0]['overlay']
+    height = overlay['y'] + overlay['inv_alpha'].shape[0] // 2
+    for frame in _frames(height):
+        expected = _draw_per_frame(frame, processed)
+        assert np.array_equal(add_text_overlays(frame.copy(), processed), expected)
+
+
+def test_blend_is_in_place_and_repeatable():
+    processed = prepare_text_configs([_config()], WIDTH)
+    frame = next(_frames())
+    expected = _draw_per_frame(frame, processed)
+    for _ in range(3):
+        target = frame.copy()
+        assert add_text_overlays(target, processed) is target
+        assert np.array_equal(target, expected)
+
+
+def test_configs_that_draw_nothing_are_skipped():
+    processed = prepare_text_configs([_config(content="  "), _config(font_path="missing.ttf")], WIDTH)
+    assert processed == []
@@ -0,0 +1,91 @@
+import pytest
+from modules import polling
+from modules.polling import PollState, poll_status
+
+
+class FakeClock:
+    """Replaces time.monotonic/time.sleep in modules.polling; sleeping advances the clock."""
+
+    def __init__(self, monkeypatch):
+        self.now = 0.0
+        self.sleeps = []
+        monkeypatch.setattr(polling.time, 'monotonic', lambda: self.now)
+        monkeypatch.setattr(polling.time, 'sleep', self.sleep)
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 6))
+        self.now += seconds
+
+
+def _classify(status):
+    return {'IN_PROGRESS': PollState.PENDING, 'FINISHED': PollState.FINISHED,
+            'ERROR': PollState.ERROR, 'EXPIRED': PollState.EXPIRED}[status]
+
+
+def _statuses(*values):
+    values = iter(values)
+    return lambda: next(values)
+
+
+def test_first_poll_is_immediate(monkeypatch):
+    clock = FakeClock(monkeypatch)
+    assert poll_status(_statuses('FINISHED'), _classify) == (PollState.FINISHED, 'FINISHED')
+    assert clock.sleeps == []
+
+
+def test_delay_grows_by_factor_up_to_max_delay(monkeypatch):
+    clock = FakeClock(monkeypatch)
+    fetch = _statuses(*['IN_PROGRESS'] * 7, 'FINISHED')
+    state, status = poll_status(fetch, _classify, deadline=1000, initial_delay=1, max_delay=5, factor=2, jitter=0)
+    assert state is PollState.FINISHED
+    assert clock.sleeps == [1, 2, 4, 5, 5, 5, 5]
+
+
+def test_jitter_stays_within_bounds(monkeypatch):
+    clock = FakeClock(monkeypatch)
+    fetch = _statuses(*['IN_PROGRESS'] * 50, 'FINISHED')
+    poll_status(fetch, _classify, deadline=10000, initial_delay=10, max_delay=10, factor=1, jitter=0.25)
+    assert all(7.5 <= s <= 12.5 for s in clock.sleeps)
+    assert len(set(clock.sleeps)) > 1
+
+
+@pytest.mark.parametrize('terminal', [PollState.ERROR, PollState.EXPIRED])
+def test_failed_states_end_the_wait(monkeypatch, terminal):
+    FakeClock(monkeypatch)
+    fetch = _statuses('IN_PROGRESS', terminal.name)
+    assert poll_status(fetch, _classify, jitter=0) == (terminal, terminal.name)
+
+
+def test_deadline_returns_timeout_with_the_last_status(monkeypatch):
+    clock = FakeClock(monkeypatch)
+    state, status = poll_status(lambda: 'IN_PROGRESS', _classify, deadline=10, initial_delay=3, max_delay=3,
+                                factor=1, jitter=0)
+    assert (state, status) == (PollState.TIMEOUT, 'IN_PROGRESS')
+    # The last wait is cut to what is left of the deadline.
+    assert clock.sleeps == [3, 3, 3, 1]
+    assert clock.now == 10
+
+
+def test_fetch_errors_count_as_pending(monkeypatch):
+    FakeClock(monkeypatch)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError("reset")
+        return 'FINISHED'
+    assert poll_status(fetch, _classify, jitter=0) == (PollState.FINISHED, 'FINISHED')
+    assert len(calls) == 3
+
+
+def test_errors_until_the_deadline_keep_the_last_good_status(monkeypatch):
+    FakeClock(monkeypatch)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        if len(calls) > 1:
+            raise ConnectionError("reset")
+        return 'IN_PROGRESS'
+    assert poll_status(fetch, _classify, deadline=5, jitter=0) == (PollState.TIMEOUT, 'IN_PROGRESS')
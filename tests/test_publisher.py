@@ -0,0 +1,49 @@
+import time
+import threading
+from modules.publisher import publish_all
+
+
+def _by_name(results):
+    return {result['name']: result for result in results}
+
+
+def test_flows_run_concurrently():
+    start = time.monotonic()
+    results = publish_all({name: (lambda name=name: time.sleep(0.3) or f"{name}-id") for name in 'abc'})
+    assert time.monotonic() - start < 0.8
+    assert [r['name'] for r in results] == ['a', 'b', 'c']
+    assert all(r['ok'] and r['error'] is None for r in results)
+    assert [r['id'] for r in results] == ['a-id', 'b-id', 'c-id']
+
+
+def test_a_flow_past_its_deadline_is_abandoned():
+    release = threading.Event()
+
+    def stuck():
+        release.wait(5)
+        return "late-id"
+
+    start = time.monotonic()
+    results = _by_name(publish_all({'stuck': stuck, 'quick': lambda: "quick-id"}, deadlines={'stuck': 0.2}))
+    assert time.monotonic() - start < 2
+    release.set()
+    assert results['stuck']['ok'] is False
+    assert results['stuck']['error'] == "timed out after 0.2s"
+    assert results['stuck']['id'] is None
+    assert results['quick']['ok'] and results['quick']['id'] == "quick-id"
+
+
+def test_default_deadline_applies_to_unlisted_flows():
+    results = _by_name(publish_all({'slow': lambda: time.sleep(1) or "id"}, deadlines={'other': 5},
+                                   default_deadline=0.1))
+    assert results['slow']['error'] == "timed out after 0.1s"
+
+
+def test_failures_are_reported_not_raised():
+    def broken():
+        raise ValueError("bad token")
+
+    results = _by_name(publish_all({'broken': broken, 'empty': lambda: None, 'ok': lambda: "id"}))
+    assert results['broken']['ok'] is False and results['broken']['error'] == "ValueError: bad token"
+    assert results['empty']['ok'] is False and results['empty']['error'] == "flow returned no id"
+    assert results['ok']['ok'] is True
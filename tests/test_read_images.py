@@ -0,0 +1,88 @@
+import threading
+import cv2
+import numpy as np
+import pytest
+from botocore.exceptions import ClientError
+from modules import s3 as s3_module
+from modules.s3 import S3Manager
+
+
+class FakeS3:
+    """get_object over a dict of key -> bytes, counting the GETs of every key."""
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.gets = {}
+        self.lock = threading.Lock()
+
+    def get_object(self, Bucket, Key, **kwargs):
+        with self.lock:
+            self.gets[Key] = self.gets.get(Key, 0) + 1
+        if Key not in self.objects:
+            raise ClientError({'Error': {'Code': 'NoSuchKey', 'Message': 'NoSuchKey'},
+                               'ResponseMetadata': {'HTTPStatusCode': 404}}, 'GetObject')
+        return {'Body': _Body(self.objects[Key]), 'ETag': f'"{Key}"'}
+
+
+class _Body:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+
+def _png(value, size=(40, 30)):
+    image = np.full((size[1], size[0], 3), value, dtype=np.uint8)
+    return cv2.imencode('.png', image)[1].tobytes()
+
+
+@pytest.fixture
+def client():
+    return FakeS3({f"pics/{i}.png": _png(i * 20) for i in range(6)})
+
+
+def test_images_come_back_in_input_order(client):
+    manager = S3Manager(s3_client=client)
+    keys = [f"pics/{i}.png" for i in (5, 0, 3, 1)]
+    images, errors = manager.read_images('bucket', keys)
+    assert errors == {}
+    assert [int(image[0, 0, 0]) for image in images] == [100, 0, 60, 20]
+
+
+def test_repeated_keys_are_fetched_once(client):
+    manager = S3Manager(s3_client=client)
+    keys = ['pics/1.png', ('pics/1.png', ('width', 20)), 'pics/2.png', 'pics/1.png',
+            ('pics/1.png', ('width', 20)), ('pics/1.png', ('square', 10))]
+    images, errors = manager.read_images('bucket', keys)
+    assert errors == {}
+    assert client.gets == {'pics/1.png': 1, 'pics/2.png': 1}
+    assert manager.gets == 2
+    assert [image.shape[:2] for image in images] == [(30, 40), (15, 20), (30, 40), (30, 40), (15, 20), (10, 10)]
+    # Repeats of one request share the cached array.
+    assert images[1] is images[4]
+
+
+def test_failures_are_reported_per_key(client):
+    client.objects['pics/broken.png'] = b'not an image'
+    manager = S3Manager(s3_client=client)
+    keys = ['pics/0.png', 'pics/missing.png', ('pics/broken.png', ('width', 20)), 'pics/1.png', 'pics/missing.png']
+    images, errors = manager.read_images('bucket', keys)
+    assert set(errors) == {'pics/missing.png', 'pics/broken.png'}
+    assert isinstance(errors['pics/missing.png'], ClientError)
+    assert isinstance(errors['pics/broken.png'], ValueError)
+    assert [image is None for image in images] == [False, True, True, False, True]
+
+
+@pytest.mark.parametrize('max_workers, keys, expected', [(None, 6, 4), (None, 2, 2), (3, 6, 3), (None, 0, 1)])
+def test_worker_count_is_capped(client, monkeypatch, max_workers, keys, expected):
+    created = []
+    executor = s3_module.ThreadPoolExecutor
+
+    def record(max_workers):
+        created.append(max_workers)
+        return executor(max_workers=max_workers)
+    monkeypatch.setattr(s3_module, 'ThreadPoolExecutor', record)
+    manager = S3Manager(max_workers=4, s3_client=client)
+    manager.read_images('bucket', [f"pics/{i}.png" for i in range(keys)], max_workers=max_workers)
+    assert created == [expected]
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from modules.utils import VirtualStrip
+from modules.renderer import ScrollTrack, FramePool, iter_frames, render_frame
+
+
+def _tiles(lengths, cross, axis, seed=0):
+    rng = np.random.default_rng(seed)
+    shape = (lambda n: (n, cross, 3)) if axis == 'y' else (lambda n: (cross, n, 3))
+    return [rng.integers(0, 256, shape(n), dtype=np.uint8) for n in lengths]
+
+
+def _scroll_track(axis, reverse, x=0, y=0, extent=90, speed=3.7):
+    strip = VirtualStrip(_tiles([40, 65, 33], 24, axis), extent + int(speed * 100), axis)
+    return ScrollTrack(strip, x, y, extent, speed, reverse)
+
+
+@pytest.mark.parametrize('axis', ['y', 'x'])
+@pytest.mark.parametrize('reverse', [False, True])
+def test_offsets_match_the_per_frame_offset(axis, reverse):
+    track = _scroll_track(axis, reverse)
+    assert track.offsets(0, 120).tolist() == [track.offset(f) for f in range(120)]
+
+
+@pytest.mark.parametrize('axis', ['y', 'x'])
+@pytest.mark.parametrize('reverse', [False, True])
+@pytest.mark.parametrize('position', [(0, 0), (-10, -15), (60, 70)])
+def test_block_drawing_matches_per_frame_drawing(axis, reverse, position):
+    """Tracks partly outside the canvas included; frames are drawn per block of 32."""
+    width, height = 100, 120
+    tracks = [_scroll_track(axis, reverse, *position)]
+    frames = [frame.copy() for frame in iter_frames(tracks, 100, width, height, block_size=32)]
+    for f, frame in enumerate(frames):
+        assert np.array_equal(frame, render_frame(tracks, f, width, height)), f
+
+
+def test_iter_frames_from_a_start_frame():
+    tracks = [_scroll_track('y', False)]
+    frames = [frame.copy() for frame in iter_frames(tracks, 50, 24, 90, start=37, block_size=8)]
+    assert len(frames) == 13
+    for f, frame in zip(range(37, 50), frames):
+        assert np.array_equal(frame, render_frame(tracks, f, 24, 90))
+
+
+def test_frame_pool_reuses_its_buffers():
+    pool = FramePool(4, 3, size=2)
+    first, second, third = pool.acquire(), pool.acquire(), pool.acquire()
+    assert first.shape == (3, 4, 3)
+    assert third is not second and np.shares_memory(first, third)
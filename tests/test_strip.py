@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from modules.utils import VirtualStrip
+
+
+def _tiles(lengths, cross, axis, seed=0):
+    rng = np.random.default_rng(seed)
+    shape = (lambda n: (n, cross, 3)) if axis == 'y' else (lambda n: (cross, n, 3))
+    return [rng.integers(0, 256, shape(n), dtype=np.uint8) for n in lengths]
+
+
+def _reference(strip):
+    """The strip as one concatenated array, as the original stacked composites built it."""
+    return np.concatenate(strip.tiles, axis=0 if strip.axis == 'y' else 1)
+
+
+@pytest.mark.parametrize('axis', ['y', 'x'])
+def test_tiles_cycle_until_the_required_length(axis):
+    tiles = _tiles([30, 50, 20], 16, axis)
+    strip = VirtualStrip(tiles, 250, axis)
+    assert strip.length >= 250
+    assert strip.starts == [0, 30, 80, 100, 130, 180, 200, 230, 280]
+    assert all(strip.tiles[i] is tiles[i % 3] for i in range(len(strip.tiles)))
+
+
+def test_at_least_one_tile_for_a_zero_length():
+    tiles = _tiles([30], 16, 'y')
+    assert len(VirtualStrip(tiles, 0, 'y').tiles) == 1
+
+
+@pytest.mark.parametrize('axis', ['y', 'x'])
+def test_copy_window_matches_the_concatenated_strip(axis):
+    strip = VirtualStrip(_tiles([30, 50, 20, 7], 16, axis), 400, axis)
+    full = _reference(strip)
+    for window in (1, 7, 45, 120):
+        for offset in range(0, strip.length - window + 1):
+            if axis == 'y':
+                out = np.empty((window, 16, 3), dtype=np.uint8)
+                strip.copy_window(offset, out)
+                expected = full[offset:offset + window]
+            else:
+                out = np.empty((16, window, 3), dtype=np.uint8)
+                strip.copy_window(offset, out)
+                expected = full[:, offset:offset + window]
+            assert np.array_equal(out, expected), (window, offset)
+
+
+@pytest.mark.parametrize('axis', ['y', 'x'])
+def test_copy_window_with_a_cross_offset(axis):
+    strip = VirtualStrip(_tiles([30, 50], 16, axis), 200, axis)
+    full = _reference(strip)
+    if axis == 'y':
+        out = np.empty((60, 5, 3), dtype=np.uint8)
+        strip.copy_window(25, out, cross_offset=9)
+        expected = full[25:85, 9:14]
+    else:
+        out = np.empty((5, 60, 3), dtype=np.uint8)
+        strip.copy_window(25, out, cross_offset=9)
+        expected = full[9:14, 25:85]
+    assert np.array_equal(out, expected)